@@ -0,0 +1,167 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import matplotlib
+matplotlib.use('Agg')  # Render off-screen; figures are sent to Streamlit as PNG images
+import matplotlib.dates as mdates
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from dataset.jobs import MP_CONTEXT
+
+# Maximum number of points or bars drawn per series
+MAX_POINTS = 500
+
+# Number of rendered charts kept in memory
+CACHE_SIZE = 64
+
+_cache = OrderedDict()  # (chart name, data fingerprint, options) -> rendered chart
+_cache_lock = threading.Lock()  # Streamlit runs sessions in separate threads
+
+_render_pool = None  # Worker processes for CPU-heavy rendering (word clouds)
+_render_pool_lock = threading.Lock()
+
+def fingerprint(*frames):
+    """Returns a short hash of the content of DataFrames/Series, used as the chart cache key.
+
+    The row hashes are hashed in order, so the same rows in a different order give another key.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for frame in frames:
+        digest.update(repr((len(frame), list(map(str, getattr(frame, 'columns', []))))).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def cached_chart(name, data_key, options, build):
+    """Returns build() for this chart and data, reusing the stored result for identical views."""
+    key = (name, data_key, options)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)  # Mark as recently used
+            return _cache[key]
+    chart = build()
+    with _cache_lock:
+        _cache[key] = chart
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)  # Drop the least recently used chart
+    return chart
+
+def figure_to_png(fig):
+    """Renders a matplotlib figure to PNG bytes and closes it so no figure memory is kept."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight', dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
+
+def lttb(x, y, n_out=MAX_POINTS):
+    """Largest-Triangle-Three-Buckets downsampling; returns the indices of the points to keep.
+
+    Keeps the first and last points and, for every bucket in between, the point forming the
+    largest triangle with the previous kept point and the average of the next bucket, which
+    preserves peaks and troughs far better than taking every n-th point.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)  # Bucket boundaries between the end points
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()  # Average point of the next bucket
+        next_y = y[end:next_end].mean()
+
+        # Triangle areas (times two) for every candidate in the bucket, computed at once
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+        keep[i + 1] = previous
+    return keep
+
+def downsample_series(df, x_column, y_column, n_out=MAX_POINTS):
+    """Returns the rows of df kept by LTTB on (x, y); dates are compared as numbers."""
+    if len(df) <= n_out:
+        return df
+    x = df[x_column]
+    x = x.astype('int64') if pd.api.types.is_datetime64_any_dtype(x) else x
+    return df.iloc[lttb(x.to_numpy(), df[y_column].to_numpy(), n_out)]
+
+def ohlc_rule(num_bars, max_bars=MAX_POINTS):
+    """Picks the resampling period that keeps a candlestick chart under max_bars."""
+    if num_bars <= max_bars:
+        return None  # Daily bars are fine
+    if num_bars / 5 <= max_bars:
+        return 'W-FRI'  # Weekly bars ending on Friday
+    return 'ME'  # Monthly bars
+
+def resample_ohlc(df, rule):
+    """Aggregates price bars with a DatetimeIndex to a coarser period."""
+    aggregation = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last',
+                   'Adj Close': 'last', 'Volume': 'sum'}
+    aggregation = {column: how for column, how in aggregation.items() if column in df.columns}
+    return df.resample(rule).agg(aggregation).dropna(subset=['Close'])
+
+def format_date_axis(ax, max_ticks=10):
+    """Uses a date locator that scales from days to years instead of one tick per date."""
+    locator = mdates.AutoDateLocator(minticks=3, maxticks=max_ticks)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+def _get_render_pool():
+    """Returns the rendering process pool, starting it on first use."""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=min(4, os.cpu_count() or 1), mp_context=MP_CONTEXT)
+        return _render_pool
+
+def render_word_cloud(words, title):
+    """Renders a word cloud of {word: weight} to PNG bytes (runs in a worker process)."""
+    from wordcloud import WordCloud  # Imported here so only the workers pay for it
+    fig, ax = plt.subplots()
+    ax.imshow(WordCloud(background_color='white').fit_words(words))
+    ax.axis('off')  # Hide axes for better visualization
+    ax.set_title(title)
+    return figure_to_png(fig)  # Closes the figure, so memory stays flat across reruns
+
+def word_cloud_images(model_key, topic_words, top_n):
+    """Returns the PNG bytes of every topic in id order, rendering cache misses in parallel.
+
+    topic_words maps each topic id to its {word: weight}; model_key identifies the model.
+    """
+    global _render_pool
+    images = {}
+    missing = {}
+    with _cache_lock:
+        for topic_id in topic_words:
+            key = ('word_cloud', model_key, (topic_id, top_n))
+            if key in _cache:
+                _cache.move_to_end(key)
+                images[topic_id] = _cache[key]
+            else:
+                missing[topic_id] = key
+
+    if missing:
+        try:
+            pool = _get_render_pool()
+            futures = {topic_id: pool.submit(render_word_cloud, topic_words[topic_id], f'Topic {topic_id + 1}')
+                       for topic_id in missing}
+            rendered = {topic_id: future.result() for topic_id, future in futures.items()}
+        except BrokenProcessPool:
+            _render_pool = None  # Start a fresh pool next time and render this batch here
+            rendered = {topic_id: render_word_cloud(topic_words[topic_id], f'Topic {topic_id + 1}')
+                        for topic_id in missing}
+        for topic_id, png in rendered.items():
+            images[topic_id] = cached_chart(*missing[topic_id], lambda png=png: png)
+
+    return [images[topic_id] for topic_id in sorted(images)]
@@ -1,11 +1,11 @@
 import os
-import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
+from dataset.frames import read_csv
 
 def load_data(file_path):
-    """Load CSV data from a specified file path."""
-    return pd.read_csv(file_path)
+    """Load CSV data from a specified file path (categorical tickers, int8 sentiment, parsed dates)."""
+    return read_csv(file_path)
 
 def folder(foldername):
     """List CSV files in the 'dataset/{foldername}' folder, allow selection, load, display the file, and calculate average sentiment."""
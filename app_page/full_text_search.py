@@ -0,0 +1,73 @@
+import math
+import sqlite3
+import matplotlib.pyplot as plt
+import streamlit as st
+from dataset.data_access import reader
+from dataset.search import count_matches, search_matches, daily_match_sentiment, lemmatize_search
+
+@st.cache_resource
+def load_lemmatizer():
+    """Returns a function lemmatizing words with spaCy (as the stored text), or None without the model."""
+    try:
+        import spacy
+        nlp = spacy.load('en_core_web_sm', disable=['parser', 'ner'])
+    except (ImportError, OSError):
+        return None  # The index still matches regular inflections through its stemmer
+    return lambda words: [' '.join(token.lemma_ for token in doc) or word for word, doc in zip(words, nlp.pipe(words))]
+
+def main():
+    st.title("Full-Text Search")  # Set the title of the Streamlit app
+    st.write("Search the news titles and StockTwits comments stored in the database. Results are ranked by relevance and the daily sentiment of the matches is shown below.")
+
+    # User inputs for the search
+    search = st.text_input("Enter the words to search for (add * to a word for prefix search)", "")
+    source = st.radio("Search in", ["News", "Stocktwits_Comments"], horizontal=True)
+    page_size = st.selectbox("Results per page", [10, 20, 50, 100], index=1)
+
+    if not search.strip():
+        st.info("Please enter a search term.")
+        return
+
+    # Search for the lemmas, since the stored text was lemmatized before saving
+    lemmatize = load_lemmatizer()
+    if lemmatize:
+        search = lemmatize_search(search, lemmatize)
+
+    # Borrow a pooled read-only connection (returned automatically, even on errors)
+    try:
+        with reader() as conn:
+            show_results(conn, search, source, page_size)
+    except sqlite3.OperationalError as e:
+        st.error(f"Search failed, try running 'Update Database' first: {e}")  # Index tables are created by db()
+
+def show_results(conn, search, source, page_size):
+    """Displays one page of ranked matches and the daily sentiment of all matches."""
+    total = count_matches(conn, source, search)  # Total number of matching rows
+    if total == 0:
+        st.warning("No matches found.")
+        return
+
+    # Page through the ranked results
+    num_pages = math.ceil(total / page_size)
+    page = st.number_input(f"Page (1 - {num_pages})", min_value=1, max_value=num_pages, value=1, step=1)
+    st.write(f"{total} matches")
+    st.write(search_matches(conn, source, search, page=page, page_size=page_size))
+
+    # Daily sentiment of all the matches, not only the current page
+    daily_df = daily_match_sentiment(conn, source, search)
+    st.subheader("Daily Sentiment of Matches")
+    fig, ax1 = plt.subplots(figsize=(10, 4))
+    ax1.bar(daily_df['Date'], daily_df['matches'], color='lightgray', label='Matches')
+    ax1.set_ylabel('Matches')
+    ax1.tick_params(axis='x', rotation=45)
+
+    # Plot the average sentiment on a secondary y-axis
+    ax2 = ax1.twinx()
+    ax2.plot(daily_df['Date'], daily_df['sentiment'], color='blue', marker='o', label='Average Sentiment')
+    ax2.set_ylabel('Sentiment Score', color='blue')
+    ax2.set_ylim(1, 5)  # Sentiment is on a 1-5 scale
+    st.pyplot(fig)
+    plt.close(fig)
+
+if __name__ == "__main__":
+    main()
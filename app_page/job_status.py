@@ -0,0 +1,49 @@
+import streamlit as st
+import dataset.jobs as jobs
+
+def submit_job(kind, params, force=False):
+    """Submits a job and remembers its id in the page URL, so a browser refresh shows the same job."""
+    job_id = jobs.submit(kind, params, force=force)
+    st.query_params[kind] = job_id
+    return job_id
+
+def current_job(kind):
+    """Returns the job of a kind shown on this page: the one in the URL, else the newest one."""
+    job_id = st.query_params.get(kind)
+    return jobs.get_job(job_id) if job_id else jobs.latest_job(kind)
+
+def show_job(kind, render_result, render_partial=None):
+    """Shows the current job of a kind: live progress while it runs, then its result or error."""
+    jobs.start_workers()  # Also marks jobs left over from a previous server as interrupted
+    job = current_job(kind)
+    if job is None:
+        return
+
+    if job['status'] in jobs.ACTIVE:
+        job_progress(job['id'], render_partial)
+    elif job['status'] == jobs.DONE:
+        render_result(jobs.get_result(job['id']))
+    elif job['status'] == jobs.FAILED:
+        st.error(f"Job failed: {job['error']}")
+    elif job['status'] == jobs.CANCELLED:
+        st.warning("Job cancelled.")
+
+@st.fragment(run_every=1)
+def job_progress(job_id, render_partial=None):
+    """Polls a running job every second; only this fragment reruns, not the whole page."""
+    job = jobs.get_job(job_id)
+    if job['status'] not in jobs.ACTIVE:
+        st.rerun()  # Rerun the whole page once to show the result
+
+    st.progress(job['progress'], text=job['message'] or job['status'].capitalize())
+
+    # Show whatever the task has produced so far
+    if render_partial:
+        partial = jobs.get_partial(job_id)
+        if partial is not None:
+            render_partial(partial)
+
+    if job['status'] == jobs.CANCELLING:
+        st.info("Cancelling...")
+    elif st.button("Cancel", key=f"cancel_{job_id}"):
+        jobs.cancel(job_id)
@@ -1,8 +1,13 @@
-import sqlite3
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import streamlit as st
+from dataset.data_access import load_news, load_comments, reader
+from dataset.topics import daily_topic_sentiment, list_topic_models
+from dataset.frames import read_csv
+from dataset.indicators import INDICATOR_COLUMNS, compute_indicators
+from dataset.sentiment import BACKENDS
+from app_page.chart_rendering import cached_chart, fingerprint, figure_to_png, downsample_series, format_date_axis
 
 def main():
     # Set the title of the Streamlit application
@@ -14,30 +19,34 @@ def main():
     stocktwit_ticker = st.sidebar.text_input("Enter the StockTwits ticker:", value="DJT")
     stock_ticker = st.sidebar.text_input("Enter the stock ticker for price data:", value="DJT")
     
-    # Establish a connection to the SQLite database
-    conn = sqlite3.connect('dataset/TrendTeller.db')
-    
-    # Load news data from the database based on user input
+    # Load news data from the database based on user input (pooled read-only connection)
     try:
-        news_df = pd.read_sql_query("SELECT * FROM News WHERE search_query = ?", conn, params=(search_query,))
+        news_df = load_news(search_query)
     except Exception as e:
         st.warning(f"News query failed: {e}")
     
     # Load StockTwits comments data based on user input
     try:
-        stocktwits_df = pd.read_sql_query("SELECT * FROM Stocktwits_Comments WHERE Ticker = ?", conn, params=(stocktwit_ticker,))
+        stocktwits_df = load_comments(stocktwit_ticker)
     except Exception as e:
         st.warning(f"StockTwits query failed: {e}")
     
     # Load stock price data from a CSV file
     try:
-        stock_df = pd.read_csv(f'dataset/stock/{stock_ticker}_stock_price.csv')
+        stock_df = read_csv(f'dataset/stock/{stock_ticker}_stock_price.csv')
     except Exception as e:
         st.warning(f"Stock price data could not be loaded: {e}")
     
+    # Scores from different backends are not on the same footing; keep one backend when they are mixed
+    news_df, stocktwits_df = filter_backends(news_df, stocktwits_df)
+
     # Convert 'Date' columns in the dataframes to datetime format for analysis
     news_df['Date'] = pd.to_datetime(news_df['Date'])
     stock_df['Date'] = pd.to_datetime(stock_df['Date'])
+
+    # Older price files were saved without indicators; compute them here so every ticker has them
+    if not set(INDICATOR_COLUMNS).issubset(stock_df.columns):
+        stock_df = compute_indicators(stock_df.set_index('Date')).reset_index()
     stocktwits_df['date'] = pd.to_datetime(stocktwits_df['date'])  # Ensure date column is datetime
     
     # Calculate average sentiment grouped by date for news data
@@ -68,117 +77,170 @@ def main():
         st.write(f'Correlation between news sentiment and stock price: {news_stock_corr:.4f}')
         st.write(f'Correlation between news sentiment and stock volume: {news_volume_corr:.4f}')
         st.write(f'Correlation between StockTwits sentiment and stock volume: {twits_volume_corr:.4f}')
+
+        # Correlations of both sentiment series with the chosen technical indicators
+        indicators = st.multiselect('Technical indicators', INDICATOR_COLUMNS, default=['RSI_14', 'MACD', 'Return'])
+        if indicators:
+            st.dataframe(pd.DataFrame({
+                'News sentiment': news_stock_df[indicators].corrwith(news_stock_df['sentiment']),
+                'StockTwits sentiment': twits_stock_df[indicators].corrwith(twits_stock_df['sentiment']),
+            }).style.format('{:.4f}'))
     
     # Create tabs for different visualizations
-    tab1, tab2, tab3 = st.tabs(["Sentiment and Stock Price", "Sentiment Correlations", "Volume Correlations"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Sentiment and Stock Price", "Sentiment Correlations", "Volume Correlations",
+                                      "Sentiment by Topic"])
 
     with tab1:
         st.subheader('Sentiment and Stock Price Over Time')
-        fig, ax1 = plt.subplots(figsize=(10, 6))
-
-        # Plot Stock Price on primary y-axis
-        ax1.plot(stock_df['Date'], stock_df['Adj Close'], color='green', marker='o', label='Adjusted Close Price')
-        ax1.set_ylabel('Adjusted Close Price', color='green')  # Label for left y-axis
-        ax1.tick_params(axis='y', labelcolor='green')
-
-        # Create a secondary y-axis for sentiment
-        ax2 = ax1.twinx()  # Instantiate a second axes that shares the same x-axis
-
-        # Plot News Sentiment on the secondary y-axis
-        ax2.plot(news_stock_df['Date'], news_stock_df['sentiment'], color='blue', marker='o', linestyle=':', label='News Sentiment')
-
-        # Plot StockTwits Sentiment on the secondary y-axis
-        ax2.plot(twits_stock_df['Date'], twits_stock_df['sentiment'], color='orange', marker='o', linestyle=':', label='StockTwits Sentiment')
-
-        # Set titles and labels
-        ax1.set_title('Sentiment and Stock Price Over Time')
-        ax1.set_xlabel('Date')
-        ax2.set_ylabel('Sentiment Score', color='blue')  # Label for right y-axis
-        ax2.tick_params(axis='y', labelcolor='blue')  # Color for the right y-axis ticks
-
-        # Rotate x-axis labels for better readability
-        ax1.set_xticks(stock_df['Date'])  # Set x-ticks to dates
-        ax1.set_xticklabels(stock_df['Date'].dt.strftime('%Y-%m-%d'), rotation=45)  # Rotate x-ticks
-
-        # Add legends for both axes
-        ax1.legend(loc='upper left')
-        ax2.legend(loc='upper right')
-
-        # Add grid lines to the primary y-axis
-        ax1.grid(True)
-
-        st.pyplot(fig)
+        # Rendered once per distinct data; long series are downsampled before drawing
+        st.image(cached_chart('price_sentiment', fingerprint(stock_df, news_stock_df, twits_stock_df), (),
+                              lambda: plot_price_sentiment(stock_df, news_stock_df, twits_stock_df)))
 
     with tab2:
         st.subheader('Scatter Plot: Sentiment vs Stock Price')
         col1, col2 = st.columns(2)
 
         with col1:
-            plt.figure(figsize=(6, 4))
             # Scatter plot for StockTwits Sentiment vs Stock Price with regression line
-            plt.scatter(twits_stock_df['sentiment'], twits_stock_df['Adj Close'], alpha=0.5, color='red')
-            z = np.polyfit(twits_stock_df['sentiment'], twits_stock_df['Adj Close'], 1)
-            p = np.poly1d(z)
-            plt.plot(twits_stock_df['sentiment'], p(twits_stock_df['sentiment']), color='black', linestyle='--')
-
-            # Set titles and labels
-            plt.title('StockTwits Sentiment vs Stock Price')
-            plt.xlabel('StockTwits Sentiment')
-            plt.ylabel('Adjusted Close Price')
-            plt.grid(True)
-            st.pyplot(plt)
+            st.image(regression_chart(twits_stock_df, 'Adj Close', 'red', 'StockTwits Sentiment vs Stock Price',
+                                      'StockTwits Sentiment', 'Adjusted Close Price'))
 
         with col2:
-            plt.figure(figsize=(6, 4))
             # Scatter plot for News Sentiment vs Stock Price with regression line
-            plt.scatter(news_stock_df['sentiment'], news_stock_df['Adj Close'], alpha=0.5, color='blue')
-            z = np.polyfit(news_stock_df['sentiment'], news_stock_df['Adj Close'], 1)
-            p = np.poly1d(z)
-            plt.plot(news_stock_df['sentiment'], p(news_stock_df['sentiment']), color='black', linestyle='--')
-
-            # Set titles and labels
-            plt.title('News Sentiment vs Stock Price')
-            plt.xlabel('News Sentiment')
-            plt.ylabel('Adjusted Close Price')
-            plt.grid(True)
-            st.pyplot(plt)
+            st.image(regression_chart(news_stock_df, 'Adj Close', 'blue', 'News Sentiment vs Stock Price',
+                                      'News Sentiment', 'Adjusted Close Price'))
 
     with tab3:
         st.subheader('Scatter Plot: Sentiment vs Stock Volume')
         col1, col2 = st.columns(2)
 
         with col1:
-            plt.figure(figsize=(6, 4))
             # Scatter plot for StockTwits Sentiment vs Stock Volume with regression line
-            plt.scatter(twits_stock_df['sentiment'], twits_stock_df['Volume'], alpha=0.5, color='red')
-            z = np.polyfit(twits_stock_df['sentiment'], twits_stock_df['Volume'], 1)
-            p = np.poly1d(z)
-            plt.plot(twits_stock_df['sentiment'], p(twits_stock_df['sentiment']), color='black', linestyle='--')
-
-            # Set titles and labels
-            plt.title('StockTwits Sentiment vs Stock Volume')
-            plt.xlabel('StockTwits Sentiment')
-            plt.ylabel('Stock Volume')
-            plt.grid(True)
-            st.pyplot(plt)
+            st.image(regression_chart(twits_stock_df, 'Volume', 'red', 'StockTwits Sentiment vs Stock Volume',
+                                      'StockTwits Sentiment', 'Stock Volume'))
 
         with col2:
-            plt.figure(figsize=(6, 4))
             # Scatter plot for News Sentiment vs Stock Volume with regression line
-            plt.scatter(news_stock_df['sentiment'], news_stock_df['Volume'], alpha=0.5, color='blue')
-            z = np.polyfit(news_stock_df['sentiment'], news_stock_df['Volume'], 1)
-            p = np.poly1d(z)
-            plt.plot(news_stock_df['sentiment'], p(news_stock_df['sentiment']), color='black', linestyle='--')
-
-            # Set titles and labels
-            plt.title('News Sentiment vs Stock Volume')
-            plt.xlabel('News Sentiment')
-            plt.ylabel('Stock Volume')
-            plt.grid(True)
-            st.pyplot(plt)
-
-    # Close the database connection to free resources
-    conn.close()
+            st.image(regression_chart(news_stock_df, 'Volume', 'blue', 'News Sentiment vs Stock Volume',
+                                      'News Sentiment', 'Stock Volume'))
+
+    with tab4:
+        st.subheader('Daily Sentiment per Topic')
+        topic_sentiment(search_query, stocktwit_ticker)
+
+NOT_RECORDED = 'not recorded'  # Rows scored before the backend was stored with them
+
+def backend_names(df):
+    """Returns the backend of every row, with NOT_RECORDED where it is unknown.
+
+    A database not yet migrated by Update Database has no sentiment_backend column at all.
+    """
+    if 'sentiment_backend' not in df:
+        return pd.Series(NOT_RECORDED, index=df.index, dtype=object)
+    return df['sentiment_backend'].astype(object).fillna(NOT_RECORDED)
+
+def filter_backends(news_df, stocktwits_df):
+    """Warns when the loaded scores come from more than one backend and keeps the rows of the chosen one."""
+    counts = pd.concat([backend_names(news_df), backend_names(stocktwits_df)]).value_counts()
+    if len(counts) <= 1:
+        return news_df, stocktwits_df
+    label = lambda name: f"{BACKENDS[name].description if name in BACKENDS else name} ({counts[name]} rows)"
+    st.warning("The loaded sentiment scores come from different models, whose scales do not match exactly: "
+               + ", ".join(label(name) for name in counts.index) + ". Choose which scores to analyze in the sidebar.")
+    chosen = st.sidebar.selectbox("Sentiment model", ['all'] + list(counts.index),
+                                  format_func=lambda name: "All (mixed)" if name == 'all' else label(name))
+    if chosen == 'all':
+        return news_df, stocktwits_df
+    return (news_df[backend_names(news_df) == chosen].reset_index(drop=True),
+            stocktwits_df[backend_names(stocktwits_df) == chosen].reset_index(drop=True))
+
+def topic_sentiment(search_query, stocktwit_ticker):
+    """Charts the daily average sentiment per topic for a model saved from the LDA page."""
+    with reader() as conn:
+        models = list_topic_models(conn)
+    if models.empty:
+        st.info("No topic assignments yet. Train a model on the Topic Modeling page and press 'Save Topic Assignments'.")
+        return
+
+    labels = {row.id: f"{row.source}: {row.num_topics} topics (model {row.id})" for row in models.itertuples()}
+    model_id = st.selectbox("Topic model", list(labels), format_func=labels.get)
+    model = models.set_index('id').loc[model_id]
+    key = search_query if model['source'] == 'news' else stocktwit_ticker
+
+    # One GROUP BY over the indexed assignment table does the whole aggregation
+    with reader() as conn:
+        daily = daily_topic_sentiment(conn, model_id, model['source'], key)
+    if daily.empty:
+        st.warning(f"No {model['source']} with saved topics for '{key}'.")
+        return
+
+    names = {i: f"Topic {i + 1}: {', '.join(words[:3])}" for i, words in enumerate(model['topic_words'])}
+    daily['topic'] = daily['topic'].map(names)
+    st.line_chart(daily.pivot_table(index='Date', columns='topic', values='sentiment'))
+
+    # Overall sentiment per topic, weighted by the number of documents of each day
+    totals = daily.assign(total=daily['sentiment'] * daily['documents']).groupby('topic')[['documents', 'total']].sum()
+    totals['sentiment'] = totals.pop('total') / totals['documents']
+    st.dataframe(totals)
+
+def plot_price_sentiment(stock_df, news_stock_df, twits_stock_df):
+    """Draws the stock price and both sentiment series over time and returns the PNG bytes."""
+    fig, ax1 = plt.subplots(figsize=(10, 6))
+
+    # Downsample long series (LTTB keeps the peaks and troughs); markers only when points are few
+    stock_plot = downsample_series(stock_df, 'Date', 'Adj Close')
+    news_plot = downsample_series(news_stock_df, 'Date', 'sentiment')
+    twits_plot = downsample_series(twits_stock_df, 'Date', 'sentiment')
+    marker = 'o' if len(stock_plot) <= 60 else None
+
+    # Plot Stock Price on primary y-axis
+    ax1.plot(stock_plot['Date'], stock_plot['Adj Close'], color='green', marker=marker, label='Adjusted Close Price')
+    ax1.set_ylabel('Adjusted Close Price', color='green')  # Label for left y-axis
+    ax1.tick_params(axis='y', labelcolor='green')
+
+    # Create a secondary y-axis for sentiment
+    ax2 = ax1.twinx()  # Instantiate a second axes that shares the same x-axis
+
+    # Plot News Sentiment on the secondary y-axis
+    ax2.plot(news_plot['Date'], news_plot['sentiment'], color='blue', marker=marker, linestyle=':', label='News Sentiment')
+
+    # Plot StockTwits Sentiment on the secondary y-axis
+    ax2.plot(twits_plot['Date'], twits_plot['sentiment'], color='orange', marker=marker, linestyle=':', label='StockTwits Sentiment')
+
+    # Set titles and labels
+    ax1.set_title('Sentiment and Stock Price Over Time')
+    ax1.set_xlabel('Date')
+    ax2.set_ylabel('Sentiment Score', color='blue')  # Label for right y-axis
+    ax2.tick_params(axis='y', labelcolor='blue')  # Color for the right y-axis ticks
+
+    # Let the locator pick a sensible number of date ticks (days to years)
+    format_date_axis(ax1)
+
+    # Add legends for both axes
+    ax1.legend(loc='upper left')
+    ax2.legend(loc='upper right')
+
+    # Add grid lines to the primary y-axis
+    ax1.grid(True)
+    return figure_to_png(fig)
+
+def regression_chart(df, y_column, color, title, xlabel, ylabel):
+    """Returns the PNG of a sentiment scatter plot with a regression line, cached by data."""
+    def build():
+        fig, ax = plt.subplots(figsize=(6, 4))
+        ax.scatter(df['sentiment'], df[y_column], alpha=0.5, color=color)
+        z = np.polyfit(df['sentiment'], df[y_column], 1)
+        p = np.poly1d(z)
+        ax.plot(df['sentiment'], p(df['sentiment']), color='black', linestyle='--')
+
+        # Set titles and labels
+        ax.set_title(title)
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        return figure_to_png(fig)
+
+    return cached_chart('regression', fingerprint(df[['sentiment', y_column]]), (y_column, color, title), build)
 
 if __name__ == "__main__":
     main()
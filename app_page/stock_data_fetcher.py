@@ -1,8 +1,12 @@
-import os
 from datetime import date
+import pandas as pd
 import streamlit as st
 import yfinance as yf
 import plotly.graph_objs as go
+from app_page.chart_rendering import cached_chart, fingerprint, downsample_series, ohlc_rule, resample_ohlc
+from app_page.job_status import show_job, submit_job
+from dataset.indicators import append_bars, read_stock_file, stock_file_paths
+from dataset.watchlist import PROVIDERS, WATCHLIST_PATH, parse_tickers, read_watchlist
 
 def main():
     st.title("Stock Data Fetcher")  # Set the app title
@@ -27,58 +31,22 @@ def main():
 
             if not stock_data.empty:  # Check if any data was returned
                 
-                # Create a candlestick chart
-                fig = go.Figure(data=[go.Candlestick(
-                    x=stock_data.index,
-                    open=stock_data['Open'],
-                    high=stock_data['High'],
-                    low=stock_data['Low'],
-                    close=stock_data['Close'],
-                    name="Candlesticks",
-                    increasing_line_color='green',  # Color for increasing prices
-                    decreasing_line_color='red'      # Color for decreasing prices
-                )])
-
-                # Add a simple moving average (e.g., 5-day)
-                stock_data['SMA_5'] = stock_data['Close'].rolling(window=5).mean()
-                fig.add_trace(go.Scatter(
-                    x=stock_data.index,
-                    y=stock_data['SMA_5'],
-                    mode='lines',
-                    name='5-Day SMA',
-                    line=dict(color='blue', width=1.5)
-                ))
-
-                # Set chart layout and title
-                fig.update_layout(
-                    title=f"{ticker} - Candlestick Chart",
-                    xaxis_title='Date',
-                    yaxis_title='Price',
-                    xaxis_rangeslider_visible=False,
-                    plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
-                    paper_bgcolor='rgba(0,0,0,0)',  # Transparent background for the paper
-                    font=dict(color='white'),  # Change font color to white
-                    width=800,
-                    height=600
-                )
+                # Store the bars with their indicators (SMA, EMA, MACD, RSI, Bollinger, VWAP, returns);
+                # bars after the stored history are appended and only their indicators are computed
+                csv_filename, _ = stock_file_paths(ticker)
+                append_bars(ticker, stock_data)
+                stored = read_stock_file(csv_filename)
+                stock_data = stored[(stored.index >= pd.Timestamp(start_date)) & (stored.index < pd.Timestamp(end_date))]
+
+                # Build the chart once per distinct data (long histories use weekly/monthly bars)
+                fig = cached_chart('candlestick', fingerprint(stock_data), (ticker,),
+                                   lambda: candlestick_chart(stock_data, ticker))
 
                 # Display the stock data in the app
                 st.write(stock_data)
-                
-                # Customize axes
-                fig.update_xaxes(showgrid=True, gridcolor='gray')
-                fig.update_yaxes(showgrid=True, gridcolor='gray')
 
                 # Display the chart using Streamlit
-                st.write(fig)
-                
-                # Specify the dataset folder and create it if it doesn't exist
-                dataset_folder = 'dataset/stock'
-                os.makedirs(dataset_folder, exist_ok=True)
-
-                # Save the CSV file directly to the dataset folder
-                csv_filename = os.path.join(dataset_folder, f'{ticker}_stock_price.csv')
-                stock_data.to_csv(csv_filename, index=True)
+                st.plotly_chart(fig)
 
                 # Inform the user that the data has been saved
                 st.success(f"Data saved to {csv_filename}")
@@ -89,6 +57,86 @@ def main():
             # Display a warning if no stock ticker symbol was entered
             st.warning("Please enter a valid stock ticker symbol.")
 
+    watchlist_refresh(start_date)
+
+def watchlist_refresh(start_date):
+    """Refreshes every ticker on the watchlist in one background job (see dataset/watchlist.py)."""
+    st.subheader("Watchlist")
+    text = st.text_area("Tickers (separated by spaces, commas or new lines)", "\n".join(read_watchlist()))
+    provider = st.selectbox("Price provider", list(PROVIDERS))
+    st.caption("Tickers with stored prices are fetched from their last stored date; new tickers from the start date above.")
+
+    if st.button("Refresh Watchlist"):
+        tickers = parse_tickers(text)
+        if tickers:
+            # Remember the watchlist for the next visit and for 'python -m dataset.watchlist'
+            with open(WATCHLIST_PATH, 'w') as f:
+                f.write("\n".join(tickers) + "\n")
+            submit_job('refresh_watchlist', refresh_watchlist_params(tickers, start_date, provider), force=True)
+        else:
+            st.warning("Please enter at least one ticker.")
+
+    show_job('refresh_watchlist', show_watchlist_result)
+
+def refresh_watchlist_params(tickers, start_date, provider):
+    """Returns the job parameters of a watchlist refresh."""
+    return {'tickers': tickers, 'start': str(start_date), 'provider': provider}
+
+def show_watchlist_result(summary):
+    """Shows how many bars were saved per ticker and which tickers failed."""
+    failed = summary[summary['Error'] != '']
+    st.success(f"Saved {summary['New bars'].sum()} new bars for {len(summary) - len(failed)} of {len(summary)} tickers "
+               f"in {summary.attrs.get('requests', 0)} requests ({summary.attrs.get('seconds', 0):.1f}s).")
+    if not failed.empty:
+        st.warning(f"{len(failed)} tickers could not be refreshed:")
+        st.dataframe(failed, hide_index=True)
+
+def candlestick_chart(stock_data, ticker):
+    """Builds the candlestick chart, resampling to weekly or monthly bars when there are too many days."""
+    rule = ohlc_rule(len(stock_data))
+    bars = resample_ohlc(stock_data, rule) if rule else stock_data
+    period = {None: 'Daily', 'W-FRI': 'Weekly', 'ME': 'Monthly'}[rule]
+
+    # Create a candlestick chart
+    fig = go.Figure(data=[go.Candlestick(
+        x=bars.index,
+        open=bars['Open'],
+        high=bars['High'],
+        low=bars['Low'],
+        close=bars['Close'],
+        name=f"{period} Candlesticks",
+        increasing_line_color='green',  # Color for increasing prices
+        decreasing_line_color='red'      # Color for decreasing prices
+    )])
+
+    # Draw the 5-day SMA as a line, downsampled with LTTB when the history is long
+    sma = downsample_series(stock_data['SMA_5'].dropna().reset_index(), stock_data.index.name or 'index', 'SMA_5')
+    fig.add_trace(go.Scatter(
+        x=sma.iloc[:, 0],
+        y=sma['SMA_5'],
+        mode='lines',
+        name='5-Day SMA',
+        line=dict(color='blue', width=1.5)
+    ))
+
+    # Set chart layout and title
+    fig.update_layout(
+        title=f"{ticker} - Candlestick Chart",
+        xaxis_title='Date',
+        yaxis_title='Price',
+        xaxis_rangeslider_visible=False,
+        plot_bgcolor='rgba(0,0,0,0)',  # Transparent background
+        paper_bgcolor='rgba(0,0,0,0)',  # Transparent background for the paper
+        font=dict(color='white'),  # Change font color to white
+        width=800,
+        height=600
+    )
+
+    # Customize axes
+    fig.update_xaxes(showgrid=True, gridcolor='gray')
+    fig.update_yaxes(showgrid=True, gridcolor='gray')
+    return fig
+
 if __name__ == "__main__":
     main()  # Run the main function to start the app
 
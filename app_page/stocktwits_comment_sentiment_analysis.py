@@ -1,14 +1,23 @@
+import os
 import re
+import json
+import hashlib
+import shutil
 import spacy
-import torch
 import pandas as pd
 from datetime import date
-from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import streamlit as st
+import dataset.jobs as jobs
+from dataset.frames import read_csv
+from dataset.sentiment import BACKENDS, DEFAULT_BACKEND, backend_label, get_backend
+from app_page.job_status import show_job, submit_job
 
 # Load the SpaCy English language model
 nlp = spacy.load('en_core_web_sm')
 
+# Columns of a processed comments file (the layout 'Update Database' loads)
+OUTPUT_COLUMNS = ['Username', 'Comment', 'date', 'Ticker', 'sentiment', 'sentiment_backend']
+
 # Function to save uploaded CSV file
 def save_uploaded_file(uploaded_file, stock_ticker):
     """Saves the uploaded CSV file with a timestamp and stock name in the dataset folder."""
@@ -17,54 +26,154 @@ def save_uploaded_file(uploaded_file, stock_ticker):
         # Construct file path for saving the uploaded file
         file_path = f'dataset/comments/{today}_stocktwit_comment_{stock_ticker}.csv'
         with open(file_path, 'wb') as f:
-            f.write(uploaded_file.getbuffer())  # Write the contents of the uploaded file
+            uploaded_file.seek(0)
+            shutil.copyfileobj(uploaded_file, f)  # Copy the upload in blocks instead of one big buffer
         return file_path
     except Exception as e:
         st.error(f"An error occurred while saving the file: {e}")  # Error handling for file saving
         return None
 
-def get_stock_comments(stock_ticker):
-    """Fetches comments related to the stock from the uploaded CSV and processes them."""
+def process_comments(stock_ticker, backend=DEFAULT_BACKEND, job=None):
+    """Cleans, lemmatizes and scores the uploaded comments in memory, saving them back to the CSV."""
     today = date.today()
     file_path = f'dataset/comments/{today}_stocktwit_comment_{stock_ticker}.csv'  # Construct file path
-    
-    try:
-        # Load the dataset from the CSV file
-        df = pd.read_csv(file_path)
 
-        # Add today's date to the 'date' column for each entry
-        df['date'] = today
+    # Load the dataset from the CSV file (categorical usernames, Arrow-backed comment strings)
+    df = read_csv(file_path)
 
-        # Clean the comments using the cleaning function
-        df['Comment'] = df['Comment'].apply(clean_comment)
+    # Add today's date to the 'date' column for each entry
+    df['date'] = today
 
-        df['Ticker'] = stock_ticker
+    # Clean the comments using the cleaning function
+    if job:
+        job.progress(0.1, "Cleaning comments")
+    df['Comment'] = df['Comment'].apply(clean_comment)
 
-        # Lemmatize cleaned comments to reduce words to their base form
-        df['Comment'] = df['Comment'].apply(lemmatize_comment)
+    df['Ticker'] = stock_ticker
 
-        # **Remove rows where the 'Comment' column is empty or contains only whitespace after cleaning**
-        df = df[df['Comment'].str.strip() != '']
+    # Lemmatize cleaned comments to reduce words to their base form
+    if job:
+        job.progress(0.3, "Lemmatizing comments")
+    df['Comment'] = lemmatize_comments(df['Comment'].tolist())
 
-        # Remove duplicate rows based on 'Username' and 'Comment', keeping only the first occurrence
-        df = df.drop_duplicates(subset=['Username', 'Comment'], keep='first')
+    # **Remove rows where the 'Comment' column is empty or contains only whitespace after cleaning**
+    df = df[df['Comment'].str.strip() != '']
 
-        # Load sentiment analysis model and tokenizer
-        tokenizer, model = load_sentiment_model()
+    # Remove duplicate rows based on 'Username' and 'Comment', keeping only the first occurrence
+    df = df.drop_duplicates(subset=['Username', 'Comment'], keep='first')
 
-        # Apply sentiment analysis to the 'Comment' column
-        df['sentiment'] = df['Comment'].apply(lambda x: get_sentiment_score(tokenizer, model, x))
+    # Apply sentiment analysis to the 'Comment' column with the chosen backend (dataset/sentiment.py)
+    if job:
+        job.progress(0.5, "Scoring sentiment")
+    df['sentiment'] = get_backend(backend).score(df['Comment'].tolist())
+    df['sentiment_backend'] = backend  # Stored with the scores, so mixed backends can be told apart
 
-        # Save the cleaned dataset back to the CSV file
-        df.to_csv(file_path, index=False)
-        
-        st.success(f"Data saved to {file_path} ")  # Inform user of successful cleaning
-        st.write(df)  # Display the cleaned dataset
+    # Save the cleaned dataset back to the CSV file
+    df.to_csv(file_path, index=False)
+    return df, file_path
 
-    except FileNotFoundError:
-        st.error("CSV file does not exist.")  # Handle case where the CSV file is not found
-    except Exception as e:
-        st.error(f"An error occurred: {e}")  # Handle other errors
+def read_checkpoint(checkpoint_path):
+    """Returns the saved progress (input rows done, output bytes written) or a fresh start."""
+    try:
+        with open(checkpoint_path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {'rows_done': 0, 'output_bytes': 0}
+
+def write_checkpoint(checkpoint_path, rows_done, output_bytes):
+    """Saves the progress atomically so a crash never leaves a half-written checkpoint."""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'rows_done': rows_done, 'output_bytes': output_bytes}, f)
+    os.replace(tmp_path, checkpoint_path)
+
+def process_chunk(chunk, stock_ticker, today, scorer):
+    """Runs the clean, lemmatize and score stages on one chunk of comments."""
+    chunk = chunk[['Username', 'Comment']].copy()
+    chunk['Comment'] = [clean_comment(str(c)) for c in chunk['Comment'].fillna('')]
+    chunk = chunk[chunk['Comment'] != '']  # Drop comments that are empty after cleaning
+    chunk['Comment'] = lemmatize_comments(chunk['Comment'].tolist())
+    chunk = chunk[chunk['Comment'].str.strip() != '']
+    chunk = chunk.drop_duplicates(subset=['Username', 'Comment'], keep='first')
+    chunk['date'] = today
+    chunk['Ticker'] = stock_ticker
+    chunk['sentiment'] = scorer.score(chunk['Comment'].tolist())
+    chunk['sentiment_backend'] = scorer.name
+    return chunk
+
+def process_comments_in_chunks(file_path, stock_ticker, chunksize=1000, backend=DEFAULT_BACKEND, progress=None):
+    """Processes a large comments CSV chunk by chunk with bounded memory and resumable checkpoints.
+
+    Results are appended to '<file>.part'; the checkpoint records how many input rows and output
+    bytes are done. An interrupted run resumes from there. When every chunk is done the output
+    replaces the original file. Duplicates across chunks are merged later by the database upsert.
+    """
+    today = date.today()
+    output_path = file_path + '.part'  # Not a .csv, so 'Update Database' ignores it until finished
+    checkpoint_path = file_path + '.checkpoint'
+    checkpoint = read_checkpoint(checkpoint_path)
+    rows_done = checkpoint['rows_done']
+
+    # Drop anything written after the last checkpoint (a chunk that was interrupted)
+    if rows_done and os.path.exists(output_path):
+        with open(output_path, 'r+b') as f:
+            f.truncate(checkpoint['output_bytes'])
+    else:
+        rows_done = 0
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    scorer = get_backend(backend)
+    with open(file_path, 'rb') as f:
+        total_rows = sum(1 for _ in f) - 1  # Line count for the progress bar only (header excluded)
+    # A callable skips the done rows without building a set of their line numbers (memory stays flat)
+    reader = read_csv(file_path, chunksize=chunksize, skiprows=lambda i: 0 < i <= rows_done)
+
+    for chunk in reader:
+        processed = process_chunk(chunk, stock_ticker, today, scorer)
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        processed[OUTPUT_COLUMNS].to_csv(
+            output_path, mode='a', header=write_header, index=False)
+
+        rows_done += len(chunk)
+        write_checkpoint(checkpoint_path, rows_done, os.path.getsize(output_path))
+        if progress:
+            progress(min(rows_done / max(total_rows, 1), 1.0))
+
+    # Replace the raw upload with the processed comments and clear the checkpoint
+    if not os.path.exists(output_path):
+        pd.DataFrame(columns=OUTPUT_COLUMNS).to_csv(output_path, index=False)
+    os.replace(output_path, file_path)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return rows_done
+
+def process_comments_job(job, stock_ticker, streaming, chunksize, upload_digest, backend=DEFAULT_BACKEND, day=None):
+    """Background job entry point for processing an uploaded file (see dataset/jobs.py).
+
+    upload_digest and day only identify the uploaded content, so the same upload reuses its result.
+    """
+    if not streaming:
+        df, file_path = process_comments(stock_ticker, backend=backend, job=job)
+        return len(df), file_path, df.head(100)
+
+    file_path = f'dataset/comments/{date.today()}_stocktwit_comment_{stock_ticker}.csv'
+    rows = process_comments_in_chunks(
+        file_path, stock_ticker, chunksize=chunksize, backend=backend,
+        progress=lambda fraction: job.progress(fraction, "Processing comments in chunks"))
+    return rows, file_path, read_csv(file_path, nrows=100)  # Only preview the first rows of a large file
+
+def process_comments_params(stock_ticker, streaming, chunksize, backend, upload):
+    """Returns the job parameters for processing an upload (its bytes), keyed by content and day."""
+    return {
+        'stock_ticker': stock_ticker, 'streaming': streaming, 'chunksize': int(chunksize), 'backend': backend,
+        'upload_digest': hashlib.sha256(upload).hexdigest(), 'day': str(date.today())}
+
+def show_comments_result(result):
+    """Displays the outcome of a finished comment processing job."""
+    rows, file_path, preview = result
+    st.success(f"{rows} comments processed. Data saved to {file_path}")  # Inform user of successful cleaning
+    st.write(preview)  # Display the cleaned dataset
 
 def clean_comment(comment):
     """Cleans individual comments by removing unwanted characters."""
@@ -84,18 +193,9 @@ def lemmatize_comment(comment):
     doc = nlp(comment)  # Process comment using SpaCy
     return ' '.join([token.lemma_ for token in doc])  # Join lemmas into a single string
 
-def load_sentiment_model():
-    """Loads the sentiment analysis model and tokenizer from the transformers library."""
-    tokenizer = AutoTokenizer.from_pretrained('nlptown/bert-base-multilingual-uncased-sentiment')  # Load tokenizer
-    model = AutoModelForSequenceClassification.from_pretrained('nlptown/bert-base-multilingual-uncased-sentiment')  # Load model
-    return tokenizer, model  # Return both
-
-def get_sentiment_score(tokenizer, model, comment):
-    """Gets the sentiment score for a comment using the loaded model."""
-    inputs = tokenizer.encode(comment, return_tensors='pt', truncation=True, max_length=512)  # Tokenize comment
-    with torch.no_grad():
-        outputs = model(inputs)  # Get model outputs without computing gradients
-    return int(torch.argmax(outputs.logits)) + 1  # Return the sentiment score (1-5 scale)
+def lemmatize_comments(comments, batch_size=256):
+    """Lemmatizes many cleaned comments at once using SpaCy's batched pipeline."""
+    return [' '.join([token.lemma_ for token in doc]) for doc in nlp.pipe(comments, batch_size=batch_size)]
 
 def main():
     st.title("StockTwits Comment Sentiment Analysis")  # Set the title for the Streamlit app
@@ -117,13 +217,32 @@ def main():
     uploaded_file = st.file_uploader("Upload your StockTwits comments CSV file", type=['csv'])
     stock_ticker = st.text_input("Enter the stock ticker")  # Input for stock ticker
 
+    # Streaming mode keeps memory flat for large exports and can resume after a crash
+    streaming = st.checkbox("Process large file in chunks (resumable)", value=False)
+    chunksize = st.number_input("Rows per chunk", min_value=100, max_value=50000, value=1000, step=100, disabled=not streaming)
+
+    # The lexicon model scores a large export in seconds; BERT is slower but more accurate
+    backend = st.selectbox("Sentiment model", list(BACKENDS), format_func=backend_label)
+
     # Check if both file and stock ticker are provided
     if uploaded_file and stock_ticker:
-        save_uploaded_file(uploaded_file, stock_ticker)  # Save the uploaded file
-        get_stock_comments(stock_ticker)  # Process comments from the saved file
+        if st.button("Process Comments"):
+            params = process_comments_params(stock_ticker, streaming, chunksize, backend, uploaded_file.getvalue())
+
+            # Only save the upload when it has not been processed already (the saved file holds the result)
+            file_path = f'dataset/comments/{date.today()}_stocktwit_comment_{stock_ticker}.csv'
+            resuming = streaming and os.path.exists(file_path + '.checkpoint')  # Keep the raw file a resumed run is reading
+            if not jobs.find_job('process_comments', params) and not resuming:
+                save_uploaded_file(uploaded_file, stock_ticker)  # Save the uploaded file
+
+            # Process in a background worker so the page stays responsive
+            submit_job('process_comments', params)
     else:
         st.warning("Please upload a file and enter a stock ticker.")  # Warning if inputs are missing
 
+    # Show progress of the latest run (also after a browser refresh)
+    show_job('process_comments', show_comments_result)
+
 if __name__ == "__main__":
     main()  # Run the main function
 
@@ -1,14 +1,18 @@
-import gensim
-import matplotlib.pyplot as plt
+import hashlib
 import nltk
 import os
-import pandas as pd
+import json
 import pyLDAvis
 import pyLDAvis.gensim_models
 import streamlit as st
 from gensim import corpora
 from nltk.corpus import stopwords
-from wordcloud import WordCloud
+from app_page.chart_rendering import word_cloud_images
+from dataset.frames import read_csv
+from dataset.lda import auto_tune_lda, build_lda_model
+from app_page.job_status import current_job, show_job, submit_job
+import dataset.jobs as jobs
+from dataset.topics import assign_topics
 
 # Download NLTK stopwords only once
 nltk.download('stopwords')
@@ -19,17 +23,19 @@ stop_words = set(stopwords.words('english'))  # Set of English stop words
 # Function to load data from a specified file path
 def load_data(file_path):
     """Loads CSV data from the specified file path."""
-    return pd.read_csv(file_path)  # Load the CSV file into a DataFrame
+    return read_csv(file_path)  # Load the CSV file into a DataFrame with the shared column types
 
 # Function to tokenize text data and remove stopwords
 def tokenize_and_clean(df, column):
     """Tokenizes text in the specified column of the DataFrame and removes stopwords."""
     # Apply tokenization and stopword removal
-    df[f'Tokenized_{column}'] = df[column].apply(
-        lambda x: [word for word in x.split() if word.lower() not in stop_words]
-    )
+    df[f'Tokenized_{column}'] = df[column].apply(tokenize)
     return df  # Return updated DataFrame with tokenized column
 
+def tokenize(text):
+    """Splits cleaned text into words and drops stopwords (also used when assigning stored documents)."""
+    return [word for word in text.split() if word.lower() not in stop_words]
+
 # Function to create dictionary and corpus for LDA
 def create_dictionary_corpus(df, token_column, no_below=5, no_above=0.5):
     """Creates a dictionary and a corpus for LDA topic modeling."""
@@ -38,23 +44,6 @@ def create_dictionary_corpus(df, token_column, no_below=5, no_above=0.5):
     corpus = [dictionary.doc2bow(comment) for comment in df[token_column]]  # Create a corpus for LDA
     return dictionary, corpus  # Return both dictionary and corpus
 
-# Function to build LDA model
-def build_lda_model(corpus, dictionary, num_topics=5, chunksize=100, passes=10, alpha='auto', eta='auto'):
-    """Builds an LDA model using the provided corpus and dictionary."""
-    lda_model = gensim.models.LdaModel(
-        corpus=corpus, 
-        id2word=dictionary, 
-        num_topics=num_topics, 
-        random_state=100, 
-        update_every=1, 
-        chunksize=chunksize, 
-        passes=passes, 
-        alpha=alpha, 
-        eta=eta,
-        per_word_topics=True  # Track topics for each word in the model
-    )
-    return lda_model  # Return the built LDA model
-
 # Function to print topics from LDA model
 def print_topics(lda_model, num_topics):
     """Prints the top words for each topic in the LDA model."""
@@ -63,16 +52,113 @@ def print_topics(lda_model, num_topics):
         topics.append(f'Topic: {idx+1} \nWords: {topic}')  # Format topic output
     return topics  # Return formatted list of topics
 
+# Function to identify a trained model by its topic-word weights
+def model_fingerprint(lda_model):
+    """Returns a hash of the model's topic-word matrix, used as the word cloud cache key."""
+    return hashlib.sha1(lda_model.get_topics().tobytes()).hexdigest()
+
 # Function to visualize word clouds for topics
-def visualize_word_clouds(lda_model, num_topics):
-    """Generates and displays word clouds for each topic in the LDA model."""
+def visualize_word_clouds(lda_model, num_topics, top_n=200):
+    """Generates word clouds for every topic in parallel (cached per model and topic) and displays them."""
     st.subheader("Word Cloud for Topics")  # Add subheader in Streamlit app
-    for i in range(num_topics):
-        plt.figure()  # Create a new figure for each topic
-        plt.imshow(WordCloud(background_color='white').fit_words(dict(lda_model.show_topic(i, 200))))  # Generate word cloud
-        plt.axis('off')  # Hide axes for better visualization
-        plt.title(f'Topic {i+1}')  # Set title for the word cloud
-        st.pyplot(plt)  # Display the word cloud in the Streamlit app
+    topic_words = {i: dict(lda_model.show_topic(i, top_n)) for i in range(num_topics)}
+    for image in word_cloud_images(model_fingerprint(lda_model), topic_words, top_n):
+        st.image(image)  # Display the word cloud in the Streamlit app
+
+def run_lda(file_path, text_column, num_topics, no_below, no_above, chunksize, passes, job=None):
+    """Trains an LDA model on a CSV file and returns (formatted topics, model)."""
+    df = load_data(file_path)  # Load data into DataFrame
+
+    # Tokenize and clean data
+    if job:
+        job.progress(0.1, "Tokenizing")
+    df = tokenize_and_clean(df, text_column)  # Perform tokenization and stopword removal
+
+    # Create dictionary and corpus
+    dictionary, corpus = create_dictionary_corpus(df, f'Tokenized_{text_column}', no_below=no_below, no_above=no_above)  # Create inputs for LDA
+
+    # Build LDA model
+    if job:
+        job.progress(0.2, "Training LDA model")
+    lda_model = build_lda_model(corpus, dictionary, num_topics=num_topics, chunksize=chunksize, passes=passes)  # Build the LDA model
+
+    return print_topics(lda_model, num_topics), lda_model
+
+def run_lda_job(job, file_mtime=None, **params):
+    """Background job entry point for 'Run LDA' (see dataset/jobs.py); file_mtime only keys the cache."""
+    return run_lda(job=job, **params)
+
+def run_lda_params(file_path, text_column, num_topics, no_below, no_above, chunksize, passes):
+    """Returns the job parameters of 'Run LDA'; the file's modification time keys the cache."""
+    return {
+        'file_path': file_path, 'text_column': text_column, 'num_topics': num_topics, 'no_below': no_below,
+        'no_above': no_above, 'chunksize': chunksize, 'passes': passes, 'file_mtime': os.path.getmtime(file_path)}
+
+def auto_tune_lda_params(file_path, text_column, topic_range, filter_grid, chunksize, passes):
+    """Returns the job parameters of an auto-tune run over topic_range and (no_below, no_above) pairs."""
+    return {
+        'file_path': file_path, 'text_column': text_column, 'topic_range': list(topic_range),
+        'filter_grid': [list(pair) for pair in filter_grid], 'chunksize': chunksize, 'passes': passes,
+        'file_mtime': os.path.getmtime(file_path)}
+
+def show_lda_result(result):
+    """Displays the topics and word clouds of a trained model."""
+    topics, lda_model = result
+
+    # Print topics
+    st.subheader("LDA Topics")  # Add subheader for displaying topics
+    for topic in topics:  # Display topics in the Streamlit app
+        st.write(topic)
+
+    # Visualize word clouds for each topic
+    visualize_word_clouds(lda_model, len(topics))  # Generate and display word clouds
+
+def auto_tune_lda_job(job, file_path, text_column, topic_range, filter_grid, chunksize, passes, file_mtime=None):
+    """Background job entry point for auto-tuning (see dataset/jobs.py); file_mtime only keys the cache."""
+    df = tokenize_and_clean(load_data(file_path), text_column)
+    lda_model, best_params, curve = auto_tune_lda(
+        df[f'Tokenized_{text_column}'].tolist(), topic_range, [tuple(f) for f in filter_grid],
+        chunksize=chunksize, passes=passes, job=job)
+    return print_topics(lda_model, best_params['num_topics']), lda_model, best_params, curve
+
+def assign_topics_job(job, model_job, source):
+    """Background job entry point for 'Save Topic Assignments': applies a trained model to the database."""
+    lda_model = jobs.get_result(model_job)[1]  # Results of run_lda and auto_tune_lda both hold the model second
+    model_id, assigned = assign_topics(lda_model, model_fingerprint(lda_model), source, tokenize, job=job)
+    return f"Saved the topics of {assigned} stored {source} (model {model_id}). See the Sentiment Report for sentiment per topic."
+
+def assign_topics_params(model_job_id, source):
+    """Returns the job parameters for applying the model of a finished job to a stored source."""
+    return {'model_job': model_job_id, 'source': source}
+
+def save_topic_assignments(kind):
+    """Offers to store the topic of every document in the database once a model has been trained."""
+    model_job = current_job(kind)
+    if model_job is None or model_job['status'] != jobs.DONE:
+        return
+    source = 'news' if json.loads(model_job['params'])['text_column'] == 'News Title' else 'comments'
+
+    st.subheader("Topic Assignments")
+    st.write(f"Apply this model to every stored {source} document and save each document's topics to the database.")
+    if st.button("Save Topic Assignments"):
+        submit_job('assign_topics', assign_topics_params(model_job['id'], source), force=True)  # Stored rows may have changed
+    show_job('assign_topics', st.success)
+
+def show_coherence_curve(curve):
+    """Plots coherence against the number of topics, one line per no_below/no_above pair."""
+    if curve.empty:
+        return
+    curve = curve.assign(filters=lambda d: 'no_below=' + d['no_below'].astype(str) + ', no_above=' + d['no_above'].astype(str))
+    st.line_chart(curve.pivot_table(index='num_topics', columns='filters', values='coherence'))
+
+def show_auto_tune_result(result):
+    """Displays the coherence curve, the chosen parameters and the best model's topics."""
+    topics, lda_model, best_params, curve = result
+    st.subheader("Coherence vs Number of Topics")
+    show_coherence_curve(curve)
+    st.write(f"Best model: {best_params['num_topics']} topics (no_below={best_params['no_below']}, "
+             f"no_above={best_params['no_above']}), coherence {best_params['coherence']:.4f}")
+    show_lda_result((topics, lda_model))
 
 def lda_workflow():
     """Main function for the LDA topic modeling Streamlit app."""
@@ -99,9 +185,6 @@ def lda_workflow():
             file_path = os.path.join(comments_folder, selected_file.split("comments/")[1])
             text_column = "Comment"  # Automatically set the text column to "Comment"
 
-        # Load the selected CSV file
-        df = load_data(file_path)  # Load data into DataFrame
-
         # LDA parameters input
         with st.expander("Adjust LDA Parameters", expanded=False):  # Expandable section
             num_topics = st.slider("Number of Topics", min_value=2, max_value=20, value=5)  # Select number of topics
@@ -110,24 +193,31 @@ def lda_workflow():
             chunksize = st.slider("Chunk Size", min_value=50, max_value=500, value=100)  # Set chunk size for processing
             passes = st.slider("Number of Passes", min_value=5, max_value=20, value=10)  # Set number of training passes
 
-        if st.button("Run LDA"):  # Button to run the LDA analysis
-            # Tokenize and clean data
-            df = tokenize_and_clean(df, text_column)  # Perform tokenization and stopword removal
+        # Auto-tune trains many candidates in parallel and keeps the most coherent model
+        with st.expander("Auto-tune Number of Topics", expanded=False):
+            auto_tune = st.checkbox("Pick the number of topics automatically (c_v coherence)")
+            topic_range = st.slider("Range of topic counts to try", min_value=2, max_value=30, value=(2, 12))
+            no_below_values = st.multiselect("no_below values to try", list(range(1, 21)), default=[no_below])
+            no_above_values = st.multiselect("no_above values to try", [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+                                             default=[round(no_above, 1)])
 
-            # Create dictionary and corpus
-            dictionary, corpus = create_dictionary_corpus(df, f'Tokenized_{text_column}', no_below=no_below, no_above=no_above)  # Create inputs for LDA
-
-            # Build LDA model
-            lda_model = build_lda_model(corpus, dictionary, num_topics=num_topics, chunksize=chunksize, passes=passes)  # Build the LDA model
-
-            # Print topics
-            st.subheader("LDA Topics")  # Add subheader for displaying topics
-            topics = print_topics(lda_model, num_topics)  # Retrieve topics from the model
-            for topic in topics:  # Display topics in the Streamlit app
-                st.write(topic)
-
-            # Visualize word clouds for each topic
-            visualize_word_clouds(lda_model, num_topics)  # Generate and display word clouds
+        if st.button("Run LDA"):  # Button to run the LDA analysis
+            if auto_tune:
+                # Train the candidates in parallel workers; identical settings reuse the earlier result
+                filter_grid = [(b, a) for b in (no_below_values or [no_below]) for a in (no_above_values or [no_above])]
+                submit_job('auto_tune_lda', auto_tune_lda_params(file_path, text_column, topic_range, filter_grid, chunksize, passes))
+            else:
+                # Train in a background worker; the same file and parameters reuse the earlier model
+                submit_job('run_lda', run_lda_params(file_path, text_column, num_topics, no_below, no_above, chunksize, passes))
+
+        # Show progress of the latest run (also after a browser refresh)
+        if auto_tune:
+            show_job('auto_tune_lda', show_auto_tune_result, render_partial=show_coherence_curve)
+        else:
+            show_job('run_lda', show_lda_result)
+
+        # Store the topics of every document in the database for the Sentiment Report
+        save_topic_assignments('auto_tune_lda' if auto_tune else 'run_lda')
 
     else:
         st.warning("No CSV files found in the 'dataset/news' or 'dataset/comments' folder.")  # Warning if no CSV files available
@@ -40,6 +40,7 @@ def main():
                 <li>**StockTwits Comment Sentiment Analysis:** Analyze sentiment on StockTwits comments from a CSV file.</li>
                 <li>**Topic Modeling LDA Analysis:** Run LDA to identify key topics and trends.</li>
                 <li>**Sentiment Report:** Visualization of sentiment trends and the correlation between sentiment, stock prices, and trading volumes.
+                <li>**Full-Text Search:** Search news titles and comments in the database, ranked by relevance, with the daily sentiment of the matches.</li>
             </ol>
         </div>
     """, unsafe_allow_html=True)
@@ -0,0 +1,180 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from dataset.data_access import reader, writer
+from dataset.schema_v2 import ensure_schema
+from dataset.sentiment import BACKENDS, DEFAULT_BACKEND, get_backend
+
+# Stored tables that can be re-scored, with their text column
+BACKFILL_TABLES = {
+    'comments': {'table': 'Stocktwits_Comments_v2', 'text': 'Comment'},
+    'news': {'table': 'News_v2', 'text': '"News Title"'},
+}
+
+# Rows scored and written per transaction
+BATCH_SIZE = 256
+
+# Seconds between throughput reports
+REPORT_EVERY = 5
+
+# One row per shard of a run; last_done is committed together with the scores it covers
+BACKFILL_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Backfill_Shards (
+        run TEXT NOT NULL,
+        shard INTEGER NOT NULL,
+        first_id INTEGER NOT NULL,  -- id range of the shard (inclusive)
+        last_id INTEGER NOT NULL,
+        last_done INTEGER NOT NULL,  -- Highest id already re-scored
+        rows_done INTEGER NOT NULL DEFAULT 0,
+        seconds REAL NOT NULL DEFAULT 0,  -- Time spent scoring and writing
+        updated_at REAL,
+        PRIMARY KEY (run, shard)
+    );
+"""
+
+def run_key(source, backend):
+    """Returns the default run name, which includes the backend's version (model name or lexicon hash).
+
+    A changed model therefore starts a new run instead of finding the old one complete.
+    """
+    return f'{source}-{backend}-{get_backend(backend).version}'
+
+def plan_shards(conn, source, run, shards):
+    """Returns the shards of a run, splitting the table's id range evenly when the run is new.
+
+    An existing run keeps its shards (and their progress), so a restarted command resumes it.
+    """
+    existing = conn.execute(
+        "SELECT shard, first_id, last_id, last_done, rows_done FROM Backfill_Shards WHERE run = ? ORDER BY shard",
+        (run,)).fetchall()
+    if existing:
+        return existing
+
+    config = BACKFILL_TABLES[source]
+    low, high = conn.execute(f"SELECT MIN(id), MAX(id) FROM {config['table']}").fetchone()
+    if low is None:
+        return []
+    step = -(-(high - low + 1) // shards)  # Ceiling division
+    plan = [(shard, start, min(start + step - 1, high), start - 1, 0)
+            for shard, start in enumerate(range(low, high + 1, step))]
+    conn.executemany(
+        "INSERT INTO Backfill_Shards (run, shard, first_id, last_id, last_done, rows_done, updated_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)", [(run, *row, time.time()) for row in plan])
+    return plan
+
+def _init_worker(threads):
+    """Pins the thread count of each worker so the processes do not oversubscribe the cores."""
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass  # The lexicon backend does not need torch
+
+def rescore_shard(source, backend, run, shard, last_id, last_done, batch_size=BATCH_SIZE):
+    """Re-scores one shard in id order, from the row after last_done up to last_id.
+
+    Each batch of scores is written in the same transaction as the shard's checkpoint, so a killed
+    worker loses at most the batch it was scoring. Returns the number of rows scored.
+    """
+    config = BACKFILL_TABLES[source]
+    scorer = get_backend(backend)
+    scored = 0
+    while True:
+        with reader() as conn:
+            rows = conn.execute(
+                f"SELECT id, {config['text']} FROM {config['table']} WHERE id > ? AND id <= ? ORDER BY id LIMIT ?",
+                (last_done, last_id, batch_size)).fetchall()
+        if not rows:
+            # Nothing left up to last_id (e.g. the rows at the end of the range were deleted)
+            if last_done < last_id:
+                with writer() as conn:
+                    conn.execute("UPDATE Backfill_Shards SET last_done = ?, updated_at = ? WHERE run = ? AND shard = ?",
+                                 (last_id, time.time(), run, shard))
+                last_done = last_id
+            break
+
+        started = time.perf_counter()
+        scores = scorer.score([text or '' for _, text in rows])
+        with writer() as conn:
+            conn.executemany(f"UPDATE {config['table']} SET sentiment = ?, sentiment_backend = ? WHERE id = ?",
+                             [(int(score), backend, row_id) for score, (row_id, _) in zip(scores, rows)])
+            conn.execute(
+                "UPDATE Backfill_Shards SET last_done = ?, rows_done = rows_done + ?, seconds = seconds + ?, "
+                "updated_at = ? WHERE run = ? AND shard = ?",
+                (rows[-1][0], len(rows), time.perf_counter() - started, time.time(), run, shard))
+        last_done = rows[-1][0]
+        scored += len(rows)
+    return scored
+
+def progress(run):
+    """Returns (rows done, finished shards, shards) of a run."""
+    with reader() as conn:
+        return conn.execute(
+            "SELECT SUM(rows_done), SUM(last_done >= last_id), COUNT(*) FROM Backfill_Shards WHERE run = ?",
+            (run,)).fetchone()
+
+def backfill(source, backend=DEFAULT_BACKEND, workers=None, shards=None, run=None, restart=False,
+             batch_size=BATCH_SIZE):
+    """Re-scores every stored row of a source across worker processes and prints the throughput.
+
+    The table is split into id ranges (shards) that the workers take in turn. Progress is kept in
+    Backfill_Shards, so running the same command again after a crash or Ctrl+C resumes the run.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shards or workers * 4  # Smaller shards balance uneven rows per range
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    run = run or run_key(source, backend)
+    config = BACKFILL_TABLES[source]
+
+    with writer() as conn:
+        ensure_schema(conn)
+        conn.executescript(BACKFILL_SCHEMA)
+        if restart:
+            conn.execute("DELETE FROM Backfill_Shards WHERE run = ?", (run,))
+        plan = plan_shards(conn, source, run, shards)
+        total = conn.execute(f"SELECT COUNT(*) FROM {config['table']}").fetchone()[0]
+
+    pending = [row for row in plan if row[3] < row[2]]  # Shards not finished yet
+    done_before = sum(row[4] for row in plan)
+    if not pending:
+        print(f"Run '{run}' is already complete ({done_before} rows). Use --restart to score again.")
+        return done_before
+    print(f"Run '{run}': {len(pending)} of {len(plan)} shards to do, {workers} workers x {threads} threads, "
+          f"{done_before} rows already done")
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads,)) as pool:
+        futures = [pool.submit(rescore_shard, source, backend, run, shard, last_id, last_done, batch_size)
+                   for shard, _, last_id, last_done, _ in pending]
+        while True:
+            finished, running = wait(futures, timeout=REPORT_EVERY)
+            rows_done, shards_done, shard_count = progress(run)
+            elapsed = time.perf_counter() - started
+            rate = (rows_done - done_before) / elapsed
+            print(f"  {rows_done}/{total} rows, {shards_done}/{shard_count} shards, {rate:,.0f} rows/s")
+            if not running:
+                break
+        for future in finished:
+            future.result()  # Raise a worker's error (its shard resumes on the next run)
+
+    scored = rows_done - done_before
+    print(f"Done: {scored} rows re-scored in {elapsed:.1f}s ({scored / max(elapsed, 1e-9):,.0f} rows/s)")
+    return rows_done
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score every stored comment or headline with a sentiment backend.")
+    parser.add_argument('source', choices=BACKFILL_TABLES)
+    parser.add_argument('--backend', choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--shards', type=int, help="Id ranges to split the table into (default: 4 per worker)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows scored and written per transaction")
+    parser.add_argument('--run', help="Name of the run to start or resume (default: <source>-<backend>-<model version>)")
+    parser.add_argument('--restart', action='store_true', help="Discard the run's progress and start over")
+    args = parser.parse_args()
+    backfill(args.source, args.backend, args.workers, args.shards, args.run, args.restart, args.batch_size)
@@ -0,0 +1,121 @@
+import argparse
+import glob
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import pandas as pd
+from dataset.schema_v2 import ensure_schema, migrate, upsert_comments, upsert_news
+
+# Original (v1) layout, kept here only to compare against the compact layout
+SCHEMA_V1 = """
+    CREATE TABLE Stocktwits_Comments (
+    Username VARCHAR(256),
+    Comment TEXT,
+    date DATE,
+    sentiment INT,
+    Ticker VARCHAR(256),
+    PRIMARY KEY (Username, Comment)
+    );
+    CREATE TABLE News (
+    "News Title" TEXT,
+    Date DATE,
+    Source VARCHAR(256),
+    URL TEXT,
+    sentiment INT,
+    search_query VARCHAR(256),
+    PRIMARY KEY (URL)
+    );
+"""
+
+def load_sample(num_rows):
+    """Loads the bundled CSVs and repeats them with distinct keys until there are num_rows comments."""
+    comments = pd.concat([pd.read_csv(f) for f in glob.glob('dataset/comments/*.csv')], ignore_index=True)
+    news = pd.concat([pd.read_csv(f) for f in glob.glob('dataset/news/*.csv')], ignore_index=True)
+
+    copies = max(1, -(-num_rows // len(comments)))  # Ceiling division
+    comments = pd.concat([
+        comments.assign(Username=comments['Username'] + f'_{i}', Ticker=f'T{i % 50}') for i in range(copies)
+    ], ignore_index=True).head(num_rows)
+    news = pd.concat([
+        news.assign(URL=news['URL'] + f'?copy={i}', search_query=f'Q{i % 50}') for i in range(copies)
+    ], ignore_index=True)
+    return comments, news
+
+def upsert_v1(conn, comments, news):
+    """Writes the sample the way the original db() did (INSERT OR REPLACE on text keys)."""
+    conn.executemany(
+        "INSERT OR REPLACE INTO Stocktwits_Comments (Username, Comment, date, sentiment, Ticker) VALUES (?, ?, ?, ?, ?)",
+        comments[['Username', 'Comment', 'date', 'sentiment', 'Ticker']].values.tolist())
+    conn.executemany(
+        'INSERT OR REPLACE INTO News ("News Title", Date, Source, URL, sentiment, search_query) VALUES (?, ?, ?, ?, ?, ?)',
+        news[['News Title', 'Date', 'Source', 'URL', 'sentiment', 'search_query']].values.tolist())
+    conn.commit()
+
+def upsert_v2(conn, comments, news):
+    """Writes the sample through the compact layout."""
+    upsert_comments(conn, comments)
+    upsert_news(conn, news)
+    conn.commit()
+
+def timed(func, *args):
+    """Returns the seconds taken by func(*args)."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+def file_size(conn, path):
+    """Vacuums the database and returns its size in MB."""
+    conn.execute("VACUUM")
+    return os.path.getsize(path) / 1024 / 1024
+
+def index_sizes(conn):
+    """Returns {index or table name: MB} when SQLite was built with the dbstat table, else {}."""
+    try:
+        rows = conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name ORDER BY 2 DESC").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {name: size / 1024 / 1024 for name, size in rows}
+
+def run(num_rows):
+    """Builds both layouts from the same sample and prints size and upsert timings."""
+    comments, news = load_sample(num_rows)
+    folder = tempfile.mkdtemp()
+    results = {}
+    try:
+        for version, create, upsert in [
+            ('v1', lambda c: c.executescript(SCHEMA_V1), upsert_v1),
+            ('v2', ensure_schema, upsert_v2),
+        ]:
+            path = os.path.join(folder, f'{version}.db')
+            conn = sqlite3.connect(path)
+            create(conn)
+            results[version] = {
+                'initial load (s)': timed(upsert, conn, comments, news),
+                're-upsert same rows (s)': timed(upsert, conn, comments, news),
+                'file size (MB)': file_size(conn, path),
+            }
+            results[version]['largest objects (MB)'] = {
+                name: round(size, 2) for name, size in list(index_sizes(conn).items())[:4]
+            }
+            conn.close()
+
+        # Time the in-place migration of the v1 file
+        shutil.copy(os.path.join(folder, 'v1.db'), os.path.join(folder, 'migrated.db'))
+        conn = sqlite3.connect(os.path.join(folder, 'migrated.db'))
+        results['v2']['migration from v1 (s)'] = timed(migrate, conn)
+        conn.close()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"{len(comments)} comments, {len(news)} news")
+    for version, metrics in results.items():
+        print(f"\n{version}")
+        for name, value in metrics.items():
+            print(f"  {name}: {value if isinstance(value, dict) else round(value, 3)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the original and compact database layouts.")
+    parser.add_argument('--rows', type=int, default=200000, help="Number of comments to generate")
+    run(parser.parse_args().rows)
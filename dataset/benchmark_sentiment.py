@@ -0,0 +1,136 @@
+import argparse
+import glob
+import time
+import numpy as np
+import pandas as pd
+from dataset.sentiment import BACKENDS, SCALE_CUTS, get_backend
+
+def load_texts():
+    """Loads the bundled comments and headlines with the scores stored for them."""
+    comments = pd.concat([pd.read_csv(f) for f in glob.glob('dataset/comments/*.csv')], ignore_index=True)
+    news = pd.concat([pd.read_csv(f) for f in glob.glob('dataset/news/*.csv')], ignore_index=True)
+    return pd.concat([
+        pd.DataFrame({'dataset': 'comments', 'text': comments['Comment'], 'stored': comments['sentiment']}),
+        pd.DataFrame({'dataset': 'news', 'text': news['News Title'], 'stored': news['sentiment']}),
+    ], ignore_index=True).dropna()
+
+def time_backend(backend, texts):
+    """Scores the texts and returns (scores, texts per second); the first call also loads the model."""
+    backend.score(texts[:8])  # Warm up (model loading is not part of the throughput)
+    start = time.perf_counter()
+    scores = backend.score(texts)
+    return scores, len(texts) / (time.perf_counter() - start)
+
+def agreement(a, b):
+    """Returns how closely two score arrays agree on the 1-5 scale."""
+    return {
+        'exact': float(np.mean(a == b)),
+        'within one': float(np.mean(np.abs(a.astype(int) - b) <= 1)),
+        'mean abs diff': float(np.mean(np.abs(a.astype(int) - b))),
+        'correlation': float(np.corrcoef(a, b)[0, 1]),
+    }
+
+def calibrate_cuts(compound, stored):
+    """Returns the four lexicon cut points that best quantile-match the stored 1-5 scores.
+
+    Many texts share a compound score (every text without a lexicon word scores 0), so exact
+    quantiles would put several cuts on the same value. Cuts are therefore chosen among the midpoints
+    between distinct compound values, strictly increasing, with the smallest total difference between
+    the share of texts below each cut and the share of stored scores below the matching grade.
+
+    The search is a dynamic program over the cuts in order, linear in the number of distinct scores.
+    """
+    values = np.unique(compound)
+    midpoints = (values[1:] + values[:-1]) / 2
+    if len(midpoints) < 4:
+        raise ValueError("Need at least five distinct compound scores to place four cuts")
+    below = np.searchsorted(np.sort(compound), midpoints) / len(compound)  # Share of texts below each midpoint
+    target = np.cumsum(np.bincount(stored, minlength=6)[1:5]) / len(stored)  # Share of scores 1, 1-2, 1-3, 1-4
+
+    # cost[i]: smallest total difference of the cuts so far with the latest one at midpoint i
+    cost = np.abs(below - target[0])
+    previous = []  # Per later cut, the best position of the cut before it for every position i
+    for share in target[1:]:
+        best_before = np.minimum.accumulate(cost)  # Best cost with the previous cut at or before i
+        best_index = _running_argmin(cost)
+        cost = np.full(len(midpoints), np.inf)
+        cost[1:] = np.abs(below[1:] - share) + best_before[:-1]
+        previous.append(np.concatenate([[-1], best_index[:-1]]))
+
+    cuts = [int(np.argmin(cost))]
+    for back in reversed(previous):
+        cuts.append(int(back[cuts[-1]]))
+    return tuple(round(float(midpoints[i]), 3) for i in reversed(cuts))
+
+def _running_argmin(values):
+    """Returns, for every position, the index of the first smallest value up to and including it."""
+    best = np.minimum.accumulate(values)
+    new_best = np.r_[True, values[1:] < best[:-1]]  # Positions that lower the running minimum
+    return np.maximum.accumulate(np.where(new_best, np.arange(len(values)), 0))
+
+def calibrate():
+    """Prints lexicon cut points calibrated on the stored (BERT) scores and how well each set agrees."""
+    data = load_texts()
+    lexicon = BACKENDS['lexicon']()
+    compound = lexicon.compound_scores(data['text'].tolist())
+    stored = data['stored'].to_numpy().astype(int)
+    cuts = calibrate_cuts(compound, stored)
+    print(f"{len(stored)} texts, stored score shares: {np.round(np.bincount(stored, minlength=6)[1:] / len(stored), 3)}")
+    for label, scale_cuts in [('current SCALE_CUTS', SCALE_CUTS), ('calibrated', cuts)]:
+        scores = np.searchsorted(scale_cuts, compound, side='right') + 1
+        shares = np.round(np.bincount(scores, minlength=6)[1:] / len(scores), 3)
+        print(f"  {label} {scale_cuts}: shares {shares}, {agreement(scores, stored)}")
+
+def run(backends, sample, rows):
+    """Prints the throughput of each backend and the agreement between backends per dataset."""
+    data = load_texts()
+    data = data.sample(min(sample, len(data)), random_state=0) if sample else data
+    texts = data['text'].tolist()
+
+    scores = {'stored': data['stored'].to_numpy()}  # Scores saved by the pipelines (the BERT model)
+    print(f"{len(texts)} texts ({(data['dataset'] == 'comments').sum()} comments, {(data['dataset'] == 'news').sum()} news)\n")
+    print("Throughput")
+    for name in backends:
+        try:
+            scores[name], rate = time_backend(get_backend(name), texts)
+        except (ImportError, OSError) as e:
+            print(f"  {name}: skipped ({e})")  # e.g. torch not installed or the model cannot be downloaded
+            continue
+        print(f"  {name}: {rate:,.0f} texts/s")
+
+    # Time the fast backends on a large table too (the bundled texts repeated)
+    if rows:
+        many = (texts * (rows // len(texts) + 1))[:rows]
+        for name in backends:
+            if name in scores and isinstance(get_backend(name), BACKENDS['lexicon']):
+                start = time.perf_counter()
+                get_backend(name).score(many)
+                print(f"  {name}: {rows:,} texts in {time.perf_counter() - start:.1f}s")
+
+    print("\nAgreement")
+    names = list(scores)
+    for dataset in ['comments', 'news']:
+        mask = (data['dataset'] == dataset).to_numpy()
+        table = pd.DataFrame({
+            f'{a} vs {b}': agreement(scores[a][mask], scores[b][mask])
+            for i, a in enumerate(names) for b in names[i + 1:]
+        }).T
+        print(f"\n{dataset}")
+        print(table.round(3).to_string())
+
+    print("\nScore distribution")
+    print(pd.DataFrame({name: pd.Series(values).value_counts(normalize=True) for name, values in scores.items()})
+          .sort_index().round(3).to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare speed and agreement of the sentiment backends.")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--sample', type=int, default=2000, help="Texts scored by every backend (0 = all)")
+    parser.add_argument('--rows', type=int, default=1000000, help="Texts scored by the lexicon backend for timing")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="Fit the lexicon cut points to the stored (BERT) scores instead of benchmarking")
+    args = parser.parse_args()
+    if args.calibrate:
+        calibrate()
+    else:
+        run(args.backends, args.sample, args.rows)
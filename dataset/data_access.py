@@ -0,0 +1,118 @@
+import atexit
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from dataset.frames import read_sql
+
+# Location of the SQLite database shared by every page
+DB_PATH = 'dataset/TrendTeller.db'
+
+# Number of read-only connections kept open for the pages
+READER_POOL_SIZE = 4
+
+# Connection tuning applied to every connection
+MMAP_SIZE = 256 * 1024 * 1024  # Map up to 256 MB of the database file into memory
+CACHE_SIZE_KB = 64 * 1024  # 64 MB page cache per connection
+
+_lock = threading.Lock()  # Guards creation of the shared connections
+_writer = None  # Single cached writer connection
+_writer_lock = threading.RLock()  # Serializes writes on the shared writer
+_readers = None  # Pool of read-only connections
+
+def _tune(conn):
+    """Applies the shared performance pragmas to a connection."""
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")  # Negative value means size in KB
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def _open_writer():
+    """Opens the writer connection and switches the database to WAL mode."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode = WAL")  # Readers keep reading while a write is running
+    conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL and much faster commits
+    return _tune(conn)
+
+def _open_reader():
+    """Opens a read-only connection that can be handed between threads."""
+    uri = Path(DB_PATH).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA query_only = ON")  # Refuse any write even if the file is writable
+    return _tune(conn)
+
+def get_writer():
+    """Returns the cached writer connection, creating it on first use."""
+    global _writer
+    with _lock:
+        if _writer is None:
+            _writer = _open_writer()
+        return _writer
+
+@contextmanager
+def writer():
+    """Yields the writer inside a transaction that is committed on success and rolled back on error."""
+    conn = get_writer()
+    with _writer_lock:  # One write transaction at a time on the shared connection
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+def _get_reader_pool():
+    """Returns the reader pool, filling it on first use."""
+    global _readers
+    get_writer()  # Make sure the database exists and is in WAL mode before opening readers
+    with _lock:
+        if _readers is None:
+            pool = queue.Queue(maxsize=READER_POOL_SIZE)
+            for _ in range(READER_POOL_SIZE):
+                pool.put(_open_reader())
+            _readers = pool
+        return _readers
+
+@contextmanager
+def reader():
+    """Borrows a read-only connection from the pool and always gives it back."""
+    pool = _get_reader_pool()
+    conn = pool.get()  # Waits if every reader is busy
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()  # Never hand back a connection holding an old snapshot
+        pool.put(conn)
+
+def close_connections():
+    """Closes the writer and every pooled reader."""
+    global _writer, _readers
+    with _lock:
+        if _readers is not None:
+            while not _readers.empty():
+                _readers.get_nowait().close()
+            _readers = None
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+
+atexit.register(close_connections)
+
+def read_query(query, params=()):
+    """Runs a SELECT on a pooled reader and returns the result as a typed DataFrame (dataset/frames.py)."""
+    with reader() as conn:
+        return read_sql(query, conn, params)
+
+# Prepared queries used by the pages
+NEWS_BY_QUERY = "SELECT * FROM News WHERE search_query = ?"
+COMMENTS_BY_TICKER = "SELECT * FROM Stocktwits_Comments WHERE Ticker = ?"
+
+def load_news(search_query):
+    """Loads the news stored for a search query."""
+    return read_query(NEWS_BY_QUERY, (search_query,))
+
+def load_comments(ticker):
+    """Loads the StockTwits comments stored for a ticker."""
+    return read_query(COMMENTS_BY_TICKER, (ticker,))
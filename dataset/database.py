@@ -1,80 +1,135 @@
-import sqlite3
 import pandas as pd
 import os
+from dataset.data_access import writer
+from dataset.schema_v2 import ensure_schema, upsert_comments, upsert_news
 
-def db():
-    # Connect to the SQLite database
-    conn = sqlite3.connect('dataset/TrendTeller.db')
+# Tokenizer of the full-text tables: the stored text is lemmatized, and the Porter stemmer reduces both
+# the lemmas and the search words to one stem, so "elections" or "rallies" still find "election", "rally"
+FTS_TOKENIZE = 'porter unicode61'
+
+def ensure_search_index(conn):
+    """Creates the FTS5 tables and their sync triggers, rebuilding tables made with another tokenizer."""
     cursor = conn.cursor()
-    
-    # Create the Stocktwits_Comments table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS Stocktwits_Comments (
-        Username VARCHAR(256),
-        Comment TEXT,
-        date DATE,
-        sentiment INT,
-        Ticker VARCHAR(256),
-        PRIMARY KEY (Username, Comment) 
+
+    # Tables from an earlier version (plain unicode61 tokenizer) are dropped and indexed again
+    existing_fts = set()
+    for name, sql in cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE name IN ('News_fts', 'Stocktwits_Comments_fts')").fetchall():
+        if FTS_TOKENIZE in sql:
+            existing_fts.add(name)
+        else:
+            cursor.execute(f"DROP TABLE {name}")
+
+    # Create the FTS5 index over news titles (external content read through the News view)
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS News_fts USING fts5(
+        "News Title",
+        content='News',
+        content_rowid='id',
+        tokenize='{FTS_TOKENIZE}'
+        );
+    """)
+
+    # Create the FTS5 index over StockTwits comments
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Stocktwits_Comments_fts USING fts5(
+        Comment,
+        content='Stocktwits_Comments',
+        content_rowid='id',
+        tokenize='{FTS_TOKENIZE}'
         );
     """)
-    
-    # Create the News table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS News (
-        "News Title" TEXT,
-        Date DATE,
-        Source VARCHAR(256),
-        URL TEXT,
-        sentiment INT,
-        search_query VARCHAR(256),
-        PRIMARY KEY (URL) 
-        );    
+
+    # Keep the News index in sync with every insert, title change and delete
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS News_fts_ai AFTER INSERT ON News_v2 BEGIN
+            INSERT INTO News_fts(rowid, "News Title") VALUES (new.id, new."News Title");
+        END;
+        CREATE TRIGGER IF NOT EXISTS News_fts_ad AFTER DELETE ON News_v2 BEGIN
+            INSERT INTO News_fts(News_fts, rowid, "News Title") VALUES ('delete', old.id, old."News Title");
+        END;
+        CREATE TRIGGER IF NOT EXISTS News_fts_au AFTER UPDATE OF "News Title" ON News_v2
+        WHEN old."News Title" IS NOT new."News Title" BEGIN
+            INSERT INTO News_fts(News_fts, rowid, "News Title") VALUES ('delete', old.id, old."News Title");
+            INSERT INTO News_fts(rowid, "News Title") VALUES (new.id, new."News Title");
+        END;
+    """)
+
+    # Keep the Stocktwits_Comments index in sync the same way
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS Stocktwits_Comments_fts_ai AFTER INSERT ON Stocktwits_Comments_v2 BEGIN
+            INSERT INTO Stocktwits_Comments_fts(rowid, Comment) VALUES (new.id, new.Comment);
+        END;
+        CREATE TRIGGER IF NOT EXISTS Stocktwits_Comments_fts_ad AFTER DELETE ON Stocktwits_Comments_v2 BEGIN
+            INSERT INTO Stocktwits_Comments_fts(Stocktwits_Comments_fts, rowid, Comment) VALUES ('delete', old.id, old.Comment);
+        END;
+        CREATE TRIGGER IF NOT EXISTS Stocktwits_Comments_fts_au AFTER UPDATE OF Comment ON Stocktwits_Comments_v2
+        WHEN old.Comment IS NOT new.Comment BEGIN
+            INSERT INTO Stocktwits_Comments_fts(Stocktwits_Comments_fts, rowid, Comment) VALUES ('delete', old.id, old.Comment);
+            INSERT INTO Stocktwits_Comments_fts(rowid, Comment) VALUES (new.id, new.Comment);
+        END;
     """)
-    
+
+    # Index rows that were stored before the full-text tables existed
+    if 'News_fts' not in existing_fts:
+        cursor.execute("INSERT INTO News_fts(News_fts) VALUES ('rebuild')")
+    if 'Stocktwits_Comments_fts' not in existing_fts:
+        cursor.execute("INSERT INTO Stocktwits_Comments_fts(Stocktwits_Comments_fts) VALUES ('rebuild')")
+
+def db(job=None):
+    # Use the shared writer connection (WAL mode, so pages keep reading during the update)
+    with writer() as conn:
+        _update(conn, job)
+
+def update_database_job(job):
+    """Background job entry point for 'Update Database' (see dataset/jobs.py)."""
+    db(job=job)
+    return "Database updated successfully!"
+
+def _update(conn, job=None):
+    # Create the compact tables (dataset/schema_v2.py), migrating the original layout if present
+    ensure_schema(conn)
+
+    # Create the full-text index (and the triggers keeping it in sync) before any rows are written
+    ensure_search_index(conn)
     conn.commit()
-    
+
     # Function to insert or update CSV file data into the database
     def insert_or_update_csv_to_db(data_table, csv_file):
         # Load the CSV data into a pandas DataFrame
         data = pd.read_csv(csv_file)
-    
-        # Handle Stocktwits_Comments table
+
+        # Handle Stocktwits_Comments table (upsert keeps the id stable, so the text is not re-indexed)
         if data_table == 'Stocktwits_Comments':
-            for index, row in data.iterrows():
-                cursor.execute('''
-                    INSERT OR REPLACE INTO Stocktwits_Comments (Username, Comment, date, sentiment, Ticker)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (row['Username'], row['Comment'], row['date'], row['sentiment'], row['Ticker']))
-        
+            upsert_comments(conn, data)
+
         # Handle News table
         elif data_table == 'News':
-            for index, row in data.iterrows():
-                cursor.execute('''
-                    INSERT OR REPLACE INTO News ("News Title", Date, Source, URL, sentiment, search_query)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (row['News Title'], row['Date'], row['Source'], row['URL'], row['sentiment'], row['search_query']))
-    
+            upsert_news(conn, data)
+
         conn.commit()
         print(f"File '{csv_file}' processed: inserted or updated records.")
-    
+        progress['done'] += 1
+        if job:
+            job.progress(progress['done'] / progress['total'], f"Processed {csv_file}")
+
     # Function to insert or update CSV files from a folder into the database
     def insert_or_update_csv_in_folder(data_table, foldername):
         # Directory containing the CSV files
         csv_folder = f'dataset/{foldername}'
-    
+
         # Loop through all CSV files in the folder
         for file_name in os.listdir(csv_folder):
             if file_name.endswith('.csv'):
                 file_path = os.path.join(csv_folder, file_name)
                 insert_or_update_csv_to_db(data_table, file_path)
-    
+
+    # Count the files up front so a background job can report progress
+    progress = {'done': 0, 'total': max(1, sum(
+        f.endswith('.csv') for folder in ('comments', 'news') for f in os.listdir(f'dataset/{folder}')))}
+
     # Process Stocktwits comments
     insert_or_update_csv_in_folder('Stocktwits_Comments', 'comments')
-    
+
     # Process News articles
     insert_or_update_csv_in_folder('News', 'news')
-    
-    # Close the database connection
-    conn.close()
-    
\ No newline at end of file
@@ -0,0 +1,86 @@
+import argparse
+import os
+import tempfile
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 (installed with Streamlit)
+    TEXT_DTYPE = 'string[pyarrow]'  # One Arrow buffer per column instead of one Python object per value
+except ImportError:
+    TEXT_DTYPE = object
+
+# Column types shared by every loader (news, comments and stock CSVs, and database queries)
+CATEGORY_COLUMNS = ['Username', 'Ticker', 'Source', 'search_query', 'sentiment_backend']  # Few distinct values, many repeats
+TEXT_COLUMNS = ['Comment', 'News Title', 'URL']
+DATE_COLUMNS = ['date', 'Date']
+SENTIMENT_COLUMNS = ['sentiment']  # Scores 1 to 5 fit in a single byte
+
+def column_types(columns):
+    """Returns the dtype mapping and the date columns that apply to the given column names."""
+    dtypes = {column: 'category' for column in CATEGORY_COLUMNS if column in columns}
+    dtypes.update({column: TEXT_DTYPE for column in TEXT_COLUMNS if column in columns})
+    dates = [column for column in DATE_COLUMNS if column in columns]
+    return dtypes, dates
+
+def compact_sentiment(df):
+    """Stores sentiment as int8, or as nullable Int8 when some rows have no score."""
+    for column in SENTIMENT_COLUMNS:
+        if column in df.columns and pd.api.types.is_numeric_dtype(df[column]):
+            values = df[column]
+            if values.notna().all() and (values % 1 == 0).all():
+                df[column] = values.astype('int8')
+            elif (values.dropna() % 1 == 0).all():
+                df[column] = values.astype('Int8')
+    return df
+
+def read_csv(file_path, **kwargs):
+    """Reads a CSV with the shared column types applied while parsing.
+
+    With chunksize, returns an iterator of typed chunks. Extra keyword arguments go to pd.read_csv.
+    """
+    columns = pd.read_csv(file_path, nrows=0).columns  # Header only
+    dtypes, dates = column_types(columns)
+    frames = pd.read_csv(file_path, dtype=dtypes, parse_dates=dates, **kwargs)
+    if kwargs.get('chunksize'):
+        return (compact_sentiment(chunk) for chunk in frames)
+    return compact_sentiment(frames)
+
+def apply_types(df):
+    """Converts an already loaded DataFrame to the shared column types."""
+    dtypes, dates = column_types(df.columns)
+    df = df.astype(dtypes)
+    for column in dates:
+        df[column] = pd.to_datetime(df[column], errors='coerce')
+    return compact_sentiment(df)
+
+def read_sql(query, conn, params=()):
+    """Runs a query and returns the result with the shared column types."""
+    return apply_types(pd.read_sql_query(query, conn, params=params))
+
+def memory_report(default, typed):
+    """Compares the deep memory use of the same table loaded with default and shared types."""
+    report = pd.DataFrame({
+        'default dtype': default.dtypes.astype(str),
+        'typed dtype': typed.dtypes.astype(str),
+        'default (MB)': default.memory_usage(deep=True, index=False) / 1024 / 1024,
+        'typed (MB)': typed.memory_usage(deep=True, index=False) / 1024 / 1024,
+    })
+    report.loc['total'] = ['', '', report['default (MB)'].sum(), report['typed (MB)'].sum()]
+    report['reduction (%)'] = (1 - report['typed (MB)'] / report['default (MB)']) * 100
+    return report.round(2)
+
+def run(num_rows):
+    """Builds a large comment table from the bundled CSVs and prints the memory report."""
+    from dataset.benchmark_schema import load_sample
+    comments, _ = load_sample(num_rows)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'comments.csv')
+        comments.to_csv(path, index=False)
+        report = memory_report(pd.read_csv(path), read_csv(path))
+    print(f"{len(comments)} comments")
+    print(report.to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory use of default and typed DataFrames.")
+    parser.add_argument('--rows', type=int, default=1000000, help="Number of comments to generate")
+    run(parser.parse_args().rows)
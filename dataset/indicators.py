@@ -0,0 +1,260 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Indicator settings
+EMA_SPANS = (12, 26)  # Fast and slow EMA, also used for MACD
+MACD_SIGNAL_SPAN = 9
+RSI_PERIOD = 14
+SMA_WINDOW = 5  # Kept for the existing SMA_5 column
+BOLLINGER_WINDOW = 20
+BOLLINGER_STDS = 2
+VWAP_WINDOW = 20
+VOLATILITY_WINDOW = 20
+TRADING_DAYS = 252  # Used to annualize volatility
+
+# Longest rolling window; the engine keeps this many rows minus one as state
+TAIL_SIZE = max(SMA_WINDOW, BOLLINGER_WINDOW, VWAP_WINDOW, VOLATILITY_WINDOW) - 1
+
+# Indicator columns stored next to the prices, in order
+INDICATOR_COLUMNS = [
+    'SMA_5', 'EMA_12', 'EMA_26', 'MACD', 'MACD_signal', 'MACD_hist', 'RSI_14',
+    'BB_mid', 'BB_upper', 'BB_lower', 'VWAP_20', 'Return', 'Log_Return', 'Volatility_20',
+]
+
+def _ema(values, span=None, alpha=None, last=None):
+    """Exponential moving average in closed form, continuing from the last EMA value.
+
+    Matches pandas ewm(adjust=False): ema[t] = alpha * x[t] + (1 - alpha) * ema[t-1], seeded with
+    the first value when there is no previous state. Leading NaNs (no value seen yet) stay NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    ema = np.full(len(values), np.nan)
+    finite = np.isfinite(values)
+    if not finite.any():
+        return ema
+    start = 0 if last is not None else int(np.argmax(finite))
+    alpha = alpha if alpha is not None else 2 / (span + 1)
+    last = values[start] if last is None else last
+    ema[start:] = _ema_recursion(values[start:], alpha, last)
+    return ema
+
+def _ema_recursion(values, alpha, last):
+    """Solves y[t] = alpha * x[t] + (1 - alpha) * y[t-1] (y[-1] = last) with cumulative sums.
+
+    With d = 1 - alpha, y[t] = d^(t+1) * (last + alpha * sum(x[k] / d^(k+1) for k <= t)). The
+    weights d^-(k+1) grow without bound, so the window is solved in blocks short enough for them
+    to stay below e^300, each block continuing from the last value of the previous one.
+    """
+    decay = 1 - alpha
+    if decay <= 0:
+        return values.copy()  # alpha = 1: the EMA is the value itself
+    block = max(1, int(300 / -np.log(decay)))
+    out = np.empty(len(values))
+    for start in range(0, len(values), block):
+        chunk = values[start:start + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)  # d^(t+1) within the block
+        out[start:start + len(chunk)] = powers * (last + alpha * np.cumsum(chunk / powers))
+        last = out[start + len(chunk) - 1]
+    return out
+
+def _fill_gaps(values, last=None):
+    """Forward-fills non-finite values (missing prices), starting from the last value of the previous update.
+
+    Values before the first finite one stay NaN when there is no previous value.
+    """
+    values = np.asarray(values, dtype=float)
+    missing = ~np.isfinite(values)
+    if not missing.any():
+        return values
+    index = np.where(missing, 0, np.arange(len(values)))
+    np.maximum.accumulate(index, out=index)  # Position of the last finite value at or before each bar
+    filled = values[index]
+    before_first = np.cumsum(~missing) == 0
+    filled[before_first] = last if last is not None else np.nan
+    return filled
+
+def _rolling(tail, new, window, func):
+    """Applies func over full windows ending at every new value; windows reach back into the tail."""
+    values = np.concatenate([tail, new])
+    out = np.full(len(new), np.nan)
+    if len(values) < window:
+        return out
+    stats = func(sliding_window_view(values, window))  # One result per full window
+    ends = np.arange(len(new)) + len(tail) - window + 1  # Window index ending at each new value
+    valid = ends >= 0
+    out[valid] = stats[ends[valid]]
+    return out
+
+class IndicatorEngine:
+    """Computes indicators bar by bar in vectorized batches and keeps the state needed to continue.
+
+    update() only processes the bars it is given, so appending new bars costs time proportional to
+    the new bars, not to the whole history.
+    """
+
+    def __init__(self, state=None):
+        self.state = state or {
+            'last_date': None,  # Date of the last processed bar
+            'last_close': None,
+            'last_adj_close': None,
+            'ema': {},  # Last EMA_12, EMA_26, MACD_signal, RSI gain and loss averages
+            'tail': {'close': [], 'pv': [], 'volume': [], 'returns': []},  # Last TAIL_SIZE values
+        }
+
+    @classmethod
+    def load(cls, path):
+        """Loads a saved engine state, or returns None if there is none."""
+        try:
+            with open(path) as f:
+                return cls(json.load(f))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, path):
+        """Saves the engine state as JSON (written atomically)."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, path)
+
+    def update(self, bars):
+        """Returns the indicators for new bars (DatetimeIndex, Open/High/Low/Close/Volume columns)."""
+        state = self.state
+        tail = {name: np.asarray(values, dtype=float) for name, values in state['tail'].items()}
+        ema = state['ema']
+
+        # A missing price (a gap in the download) repeats the last known one, so a single NaN does not
+        # reach the EMA state and stay there for every later update
+        close = _fill_gaps(bars['Close'].to_numpy(dtype=float), state['last_close'])
+        adj_close = (_fill_gaps(bars['Adj Close'].to_numpy(dtype=float), state['last_adj_close'])
+                     if 'Adj Close' in bars.columns else close)
+        volume = np.nan_to_num(bars['Volume'].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        high = bars['High'].to_numpy(dtype=float)
+        low = bars['Low'].to_numpy(dtype=float)
+        typical = (np.where(np.isfinite(high), high, close) + np.where(np.isfinite(low), low, close) + close) / 3
+        pv = typical * volume
+
+        out = {}  # Column arrays, turned into one DataFrame at the end
+
+        # Moving averages and MACD
+        out['SMA_5'] = _rolling(tail['close'][-(SMA_WINDOW - 1):], close, SMA_WINDOW, lambda w: w.mean(axis=1))
+        fast = _ema(close, span=EMA_SPANS[0], last=ema.get('EMA_12'))
+        slow = _ema(close, span=EMA_SPANS[1], last=ema.get('EMA_26'))
+        out['EMA_12'], out['EMA_26'] = fast, slow
+        out['MACD'] = fast - slow
+        out['MACD_signal'] = _ema(out['MACD'], span=MACD_SIGNAL_SPAN, last=ema.get('MACD_signal'))
+        out['MACD_hist'] = out['MACD'] - out['MACD_signal']
+
+        # RSI with Wilder smoothing (alpha = 1 / period)
+        previous_close = np.concatenate([[state['last_close'] if state['last_close'] is not None else np.nan], close[:-1]])
+        change = close - previous_close
+        has_change = ~np.isnan(change)  # The very first bar has no previous close
+        gain = np.where(change > 0, change, 0.0)[has_change]
+        loss = np.where(change < 0, -change, 0.0)[has_change]
+        avg_gain = np.full(len(close), np.nan)
+        avg_loss = np.full(len(close), np.nan)
+        avg_gain[has_change] = _ema(gain, alpha=1 / RSI_PERIOD, last=ema.get('avg_gain'))
+        avg_loss[has_change] = _ema(loss, alpha=1 / RSI_PERIOD, last=ema.get('avg_loss'))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        out['RSI_14'] = np.where(np.isnan(avg_gain), np.nan, rsi)
+
+        # Bollinger bands
+        mid = _rolling(tail['close'], close, BOLLINGER_WINDOW, lambda w: w.mean(axis=1))
+        std = _rolling(tail['close'], close, BOLLINGER_WINDOW, lambda w: w.std(axis=1, ddof=1))
+        out['BB_mid'] = mid
+        out['BB_upper'] = mid + BOLLINGER_STDS * std
+        out['BB_lower'] = mid - BOLLINGER_STDS * std
+
+        # Rolling volume-weighted average price
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out['VWAP_20'] = (_rolling(tail['pv'], pv, VWAP_WINDOW, lambda w: w.sum(axis=1))
+                              / _rolling(tail['volume'], volume, VWAP_WINDOW, lambda w: w.sum(axis=1)))
+
+        # Returns and annualized volatility
+        previous_adj = np.concatenate([[state['last_adj_close'] if state['last_adj_close'] is not None else np.nan], adj_close[:-1]])
+        returns = adj_close / previous_adj - 1
+        out['Return'] = returns
+        out['Log_Return'] = np.log1p(returns)
+        out['Volatility_20'] = _rolling(tail['returns'], returns, VOLATILITY_WINDOW,
+                                        lambda w: w.std(axis=1, ddof=1)) * np.sqrt(TRADING_DAYS)
+
+        # Remember what the next update needs (only finite values, so a gap never poisons the state)
+        if len(bars):
+            last_values = {'EMA_12': fast[-1], 'EMA_26': slow[-1], 'MACD_signal': out['MACD_signal'][-1]}
+            if has_change.any():
+                last_values.update({'avg_gain': avg_gain[has_change][-1], 'avg_loss': avg_loss[has_change][-1]})
+            ema.update({name: float(value) for name, value in last_values.items() if np.isfinite(value)})
+            state['last_date'] = str(pd.Timestamp(bars.index[-1]).date())
+            if np.isfinite(close[-1]):
+                state['last_close'] = float(close[-1])
+            if np.isfinite(adj_close[-1]):
+                state['last_adj_close'] = float(adj_close[-1])
+            for name, values in (('close', close), ('pv', pv), ('volume', volume), ('returns', returns)):
+                state['tail'][name] = [float(v) for v in np.concatenate([tail[name], values])[-TAIL_SIZE:]]
+        return pd.DataFrame(out, index=bars.index, columns=INDICATOR_COLUMNS)
+
+def compute_indicators(bars):
+    """Returns the bars with every indicator column computed from scratch."""
+    prices = bars.drop(columns=[c for c in INDICATOR_COLUMNS if c in bars.columns])
+    return prices.join(IndicatorEngine().update(prices))
+
+def stock_file_paths(ticker, folder='dataset/stock'):
+    """Returns the price CSV path and the indicator state path of a ticker."""
+    return (os.path.join(folder, f'{ticker}_stock_price.csv'),
+            os.path.join(folder, f'{ticker}_indicator_state.json'))
+
+def read_stock_file(csv_path):
+    """Reads a stored price CSV with a DatetimeIndex named Date."""
+    return pd.read_csv(csv_path, index_col='Date', parse_dates=['Date'])
+
+def matches_stored(bars, stored, last_date):
+    """Returns True if every bar up to last_date is already stored with the same prices."""
+    overlap = bars[bars.index <= pd.Timestamp(last_date)]
+    if overlap.empty:
+        return True
+    if not overlap.index.isin(stored.index).all():
+        return False  # A bar missing from the stored history
+    columns = [c for c in overlap.columns if c not in INDICATOR_COLUMNS and c in stored.columns
+               and pd.api.types.is_numeric_dtype(overlap[c])]
+    old = stored.loc[overlap.index, columns].to_numpy(dtype=float)
+    return bool(np.isclose(overlap[columns].to_numpy(dtype=float), old, rtol=1e-9, equal_nan=True).all())
+
+def append_bars(ticker, bars, folder='dataset/stock'):
+    """Stores new price bars with their indicators and returns the number of bars written.
+
+    Bars after the last stored date are appended and only their indicators are computed, from the
+    saved engine state. Bars that repeat stored ones unchanged are skipped. If there is no state
+    yet, or a bar falls inside the stored history with new or different prices, the indicators of
+    the whole merged history are recomputed and the file is rewritten.
+    """
+    os.makedirs(folder, exist_ok=True)
+    csv_path, state_path = stock_file_paths(ticker, folder)
+    bars = bars.sort_index()
+    bars.index.name = 'Date'
+    engine = IndicatorEngine.load(state_path)
+    stored = read_stock_file(csv_path) if os.path.exists(csv_path) else None
+
+    # Incremental path: only the tail is new
+    if engine and stored is not None and len(stored) and matches_stored(bars, stored, engine.state['last_date']):
+        new_bars = bars[bars.index > pd.Timestamp(engine.state['last_date'])]
+        if new_bars.empty:
+            return 0
+        prices = new_bars.drop(columns=[c for c in INDICATOR_COLUMNS if c in new_bars.columns])
+        rows = prices.join(engine.update(prices))
+        rows.reindex(columns=stored.columns).to_csv(csv_path, mode='a', header=False)  # Same column order as the file
+        engine.save(state_path)
+        return len(rows)
+
+    # Full path: merge with what is stored (new bars win) and recompute everything
+    if stored is not None:
+        bars = pd.concat([stored[~stored.index.isin(bars.index)], bars]).sort_index()
+    prices = bars.drop(columns=[c for c in INDICATOR_COLUMNS if c in bars.columns])
+    engine = IndicatorEngine()
+    rows = prices.join(engine.update(prices))
+    rows.to_csv(csv_path)
+    engine.save(state_path)
+    return len(rows)
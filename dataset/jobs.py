@@ -0,0 +1,216 @@
+import hashlib
+import importlib
+import json
+import multiprocessing
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing
+
+# Job table lives in its own file so progress updates never compete with database ingest
+JOBS_DB_PATH = 'dataset/jobs.db'
+
+# Number of worker processes running jobs in the background
+MAX_WORKERS = 2
+
+# Spawn (not fork) so workers do not inherit the Streamlit server's threads
+MP_CONTEXT = multiprocessing.get_context('spawn')
+
+# Long-running tasks, referenced by name so a worker only imports the module it runs
+TASKS = {
+    'scrape_news': 'app_page.news_scraper_sentiment_analysis:scrape_news_job',
+    'process_comments': 'app_page.stocktwits_comment_sentiment_analysis:process_comments_job',
+    'run_lda': 'app_page.topic_modeling_lda_analysis:run_lda_job',
+    'auto_tune_lda': 'app_page.topic_modeling_lda_analysis:auto_tune_lda_job',
+    'update_database': 'dataset.database:update_database_job',
+    'refresh_watchlist': 'dataset.watchlist:refresh_watchlist_job',
+    'assign_topics': 'app_page.topic_modeling_lda_analysis:assign_topics_job',
+}
+
+# Job states
+QUEUED, RUNNING, CANCELLING = 'queued', 'running', 'cancelling'
+DONE, FAILED, CANCELLED = 'done', 'failed', 'cancelled'
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+_pool = None  # Worker pool shared by every session of the Streamlit server
+_pool_lock = threading.Lock()
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+def _connect():
+    """Opens the job database, creating the Jobs table on first use."""
+    conn = sqlite3.connect(JOBS_DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")  # Pages poll while workers write progress
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS Jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        params TEXT NOT NULL,
+        cache_key TEXT NOT NULL,
+        status TEXT NOT NULL,
+        progress REAL DEFAULT 0,
+        message TEXT,
+        partial BLOB,
+        result BLOB,
+        error TEXT,
+        created_at REAL,
+        finished_at REAL
+        );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_cache_key ON Jobs (cache_key, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind ON Jobs (kind, created_at)")
+    return conn
+
+def _update(job_id, status_before=None, **fields):
+    """Updates columns of one job (only while its status is status_before, if given); returns True if it did."""
+    columns = ', '.join(f'{name} = ?' for name in fields)
+    query, params = f"UPDATE Jobs SET {columns} WHERE id = ?", (*fields.values(), job_id)
+    if status_before:
+        query, params = query + " AND status = ?", (*params, status_before)
+    with closing(_connect()) as conn, conn:
+        return conn.execute(query, params).rowcount > 0
+
+def cache_key(kind, params):
+    """Returns a stable key for a task and its parameters; equal keys share one result."""
+    payload = json.dumps({'kind': kind, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def start_workers(keep=None):
+    """Returns the worker pool, starting it (and cleaning up after a restart) on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Jobs left active by a previous server or a crashed pool can no longer finish
+            with closing(_connect()) as conn, conn:
+                conn.execute(
+                    "UPDATE Jobs SET status = ?, error = ? WHERE status IN (?, ?, ?) AND id IS NOT ?",
+                    (FAILED, 'Interrupted by a server restart or a crashed worker', *ACTIVE, keep))
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=MP_CONTEXT)
+        return _pool
+
+def find_job(kind, params):
+    """Returns the id of a finished or running job with the same parameters, or None."""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT id FROM Jobs WHERE cache_key = ? AND status IN (?, ?, ?) ORDER BY created_at DESC LIMIT 1",
+            (cache_key(kind, params), DONE, QUEUED, RUNNING)).fetchone()
+    return row['id'] if row else None
+
+def create_job(kind, params):
+    """Adds a queued job to the table (params stored as JSON, as the worker will receive them) and returns its id."""
+    job_id = uuid.uuid4().hex
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            "INSERT INTO Jobs (id, kind, params, cache_key, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params, default=str), cache_key(kind, params), QUEUED, time.time()))
+    return job_id
+
+def submit(kind, params, force=False):
+    """Queues a task and returns its job id, reusing a finished or running job with the same parameters."""
+    if kind not in TASKS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    pool = start_workers()
+
+    if not force:
+        job_id = find_job(kind, params)
+        if job_id:
+            return job_id  # Cached result or identical job already in progress
+
+    job_id = create_job(kind, params)
+    try:
+        pool.submit(_run_job, job_id)
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory), which breaks the whole pool; start a fresh one
+        global _pool
+        _pool = None
+        start_workers(keep=job_id).submit(_run_job, job_id)
+    return job_id
+
+def get_job(job_id):
+    """Returns the status fields of a job as a dict (without result data), or None."""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT id, kind, params, status, progress, message, error, created_at, finished_at FROM Jobs WHERE id = ?",
+            (job_id,)).fetchone()
+    return dict(row) if row else None
+
+def latest_job(kind):
+    """Returns the most recent job of a kind, so a page can pick it up again after a browser refresh."""
+    with closing(_connect()) as conn:
+        row = conn.execute(
+            "SELECT id FROM Jobs WHERE kind = ? ORDER BY created_at DESC LIMIT 1", (kind,)).fetchone()
+    return get_job(row['id']) if row else None
+
+def _load_blob(job_id, column):
+    """Unpickles the result or partial result of a job."""
+    with closing(_connect()) as conn:
+        row = conn.execute(f"SELECT {column} FROM Jobs WHERE id = ?", (job_id,)).fetchone()
+    return pickle.loads(row[column]) if row and row[column] is not None else None
+
+def get_result(job_id):
+    """Returns the result of a finished job."""
+    return _load_blob(job_id, 'result')
+
+def get_partial(job_id):
+    """Returns the latest partial result reported by a running job."""
+    return _load_blob(job_id, 'partial')
+
+def cancel(job_id):
+    """Cancels a job: queued jobs never start, running jobs stop at their next progress report."""
+    with closing(_connect()) as conn, conn:
+        conn.execute("UPDATE Jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ?",
+                     (CANCELLED, time.time(), job_id, QUEUED))
+        conn.execute("UPDATE Jobs SET status = ? WHERE id = ? AND status = ?",
+                     (CANCELLING, job_id, RUNNING))
+
+class JobContext:
+    """Handed to every task so it can report progress and notice cancellation."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, fraction, message=None, partial=None):
+        """Saves progress (0-1), an optional message and partial result; raises JobCancelled if cancelled."""
+        fields = {'progress': min(max(fraction, 0.0), 1.0)}
+        if message is not None:
+            fields['message'] = message
+        if partial is not None:
+            fields['partial'] = pickle.dumps(partial)
+        _update(self.job_id, **fields)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """Raises JobCancelled if the user cancelled the job."""
+        if get_job(self.job_id)['status'] == CANCELLING:
+            raise JobCancelled()
+
+def _load_task(kind):
+    """Imports the function registered for a job kind."""
+    module_name, func_name = TASKS[kind].split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+def _run_job(job_id):
+    """Runs one job inside a worker process and stores its outcome."""
+    with closing(_connect()) as conn, conn:
+        started = conn.execute("UPDATE Jobs SET status = ? WHERE id = ? AND status = ?",
+                               (RUNNING, job_id, QUEUED)).rowcount
+        row = conn.execute("SELECT kind, params FROM Jobs WHERE id = ?", (job_id,)).fetchone()
+    if not started:
+        return  # Cancelled before a worker picked it up
+
+    try:
+        result = _load_task(row['kind'])(JobContext(job_id), **json.loads(row['params']))
+        # A job cancelled during a step without progress reports finishes as cancelled, without its result
+        if not _update(job_id, status_before=RUNNING, status=DONE, progress=1.0, result=pickle.dumps(result),
+                       finished_at=time.time()):
+            _update(job_id, status=CANCELLED, finished_at=time.time())
+    except JobCancelled:
+        _update(job_id, status=CANCELLED, finished_at=time.time())
+    except Exception as e:
+        _update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}", finished_at=time.time())
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import gensim
+import pandas as pd
+from gensim import corpora
+from gensim.models import CoherenceModel
+
+# Model training shared by the Topic Modeling page and its auto-tune workers. Kept free of page-level
+# side effects (Streamlit, NLTK downloads), since every spawned worker imports this module.
+
+def build_lda_model(corpus, dictionary, num_topics=5, chunksize=100, passes=10, alpha='auto', eta='auto'):
+    """Builds an LDA model using the provided corpus and dictionary."""
+    lda_model = gensim.models.LdaModel(
+        corpus=corpus,
+        id2word=dictionary,
+        num_topics=num_topics,
+        random_state=100,
+        update_every=1,
+        chunksize=chunksize,
+        passes=passes,
+        alpha=alpha,
+        eta=eta,
+        per_word_topics=True  # Track topics for each word in the model
+    )
+    return lda_model
+
+# Data shared by every auto-tune worker, set once per process by _init_tuning_worker
+_tuning_data = {}
+
+def _init_tuning_worker(texts, dictionaries):
+    """Receives the tokenized texts and the prebuilt dictionaries/corpora once per worker process."""
+    _tuning_data['texts'] = texts
+    _tuning_data['dictionaries'] = dictionaries
+
+def _train_candidate(filters, num_topics, chunksize, passes):
+    """Trains one candidate model in a worker and scores it with c_v coherence."""
+    dictionary, corpus = _tuning_data['dictionaries'][filters]
+    lda_model = build_lda_model(corpus, dictionary, num_topics=num_topics, chunksize=chunksize, passes=passes)
+    coherence = CoherenceModel(model=lda_model, texts=_tuning_data['texts'], dictionary=dictionary,
+                               coherence='c_v', processes=1).get_coherence()  # No nested pool in the worker
+    return filters, num_topics, coherence, lda_model
+
+def plateaued(scores, topic_counts, patience, min_delta):
+    """Returns True once `patience` counts in a row after the best one did not improve it by min_delta.
+
+    scores holds {topic count: coherence} of one filter pair. Counts are read in increasing order and
+    only up to the first one not trained yet, so the answer does not depend on which worker finished first.
+    """
+    best, stale = float('-inf'), 0
+    for num_topics in topic_counts:
+        if num_topics not in scores:
+            return False
+        if scores[num_topics] > best + min_delta:
+            best, stale = scores[num_topics], 0
+        else:
+            stale += 1
+            if stale >= patience:
+                return True
+    return False
+
+def auto_tune_lda(texts, topic_range, filter_grid, chunksize=100, passes=10, workers=None,
+                  patience=3, min_delta=0.005, job=None):
+    """Trains candidate models over topic counts (and no_below/no_above pairs) in parallel.
+
+    Candidates are trained in increasing topic count, at most `patience` at a time per filter pair, so a
+    plateau (see plateaued) stops a pair before its larger counts are started. Only the best model of each
+    pair is kept. Returns (best model, best parameters dict, DataFrame of coherence per candidate).
+    """
+    # Build each dictionary/corpus once; every candidate with the same filters shares it
+    dictionaries = {}
+    for no_below, no_above in filter_grid:
+        dictionary = corpora.Dictionary(texts)
+        dictionary.filter_extremes(no_below=no_below, no_above=no_above)
+        dictionaries[(no_below, no_above)] = (dictionary, [dictionary.doc2bow(text) for text in texts])
+
+    topic_counts = list(range(topic_range[0], topic_range[1] + 1))
+    pending = {filters: list(topic_counts) for filters in dictionaries}  # Counts not started yet
+    in_flight = {filters: 0 for filters in dictionaries}
+    scores = {filters: {} for filters in dictionaries}  # filters -> {topic count: coherence}
+    best = {}  # filters -> (coherence, topic count, model), the only models kept
+    total = sum(len(counts) for counts in pending.values())
+    workers = workers or max(1, min(os.cpu_count() or 1, len(dictionaries) * patience))
+
+    def next_candidate():
+        """Returns the next (filters, topic count) to train, or None if every pair is busy or done."""
+        for filters, counts in pending.items():
+            if counts and in_flight[filters] < patience:
+                in_flight[filters] += 1
+                return filters, counts.pop(0)
+        return None
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_tuning_worker, initargs=(texts, dictionaries)) as pool:
+        running = set()
+        while True:
+            while len(running) < workers and (candidate := next_candidate()):
+                running.add(pool.submit(_train_candidate, *candidate, chunksize, passes))
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                filters, num_topics, coherence, lda_model = future.result()
+                in_flight[filters] -= 1
+                scores[filters][num_topics] = coherence
+                if filters not in best or coherence > best[filters][0]:
+                    best[filters] = (coherence, num_topics, lda_model)
+                if plateaued(scores[filters], topic_counts, patience, min_delta):
+                    pending[filters].clear()  # Larger counts are not worth training
+
+            if job:
+                trained = sum(len(pair_scores) for pair_scores in scores.values())
+                job.progress(trained / total, f"Trained {trained} candidate models",
+                             partial=coherence_curve(scores))
+
+    filters, (coherence, num_topics, lda_model) = max(best.items(), key=lambda item: item[1][0])
+    best_params = {'num_topics': num_topics, 'no_below': filters[0], 'no_above': filters[1], 'coherence': float(coherence)}
+    return lda_model, best_params, coherence_curve(scores)
+
+def coherence_curve(scores):
+    """Returns the coherence of every trained candidate as a DataFrame sorted by topic count."""
+    rows = [{'no_below': filters[0], 'no_above': filters[1], 'num_topics': num_topics, 'coherence': coherence}
+            for filters, pair_scores in scores.items() for num_topics, coherence in pair_scores.items()]
+    return pd.DataFrame(rows, columns=['no_below', 'no_above', 'num_topics', 'coherence']).sort_values(
+        ['no_below', 'no_above', 'num_topics'])
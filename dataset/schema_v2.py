@@ -0,0 +1,216 @@
+import hashlib
+
+# Value stored in PRAGMA user_version once the database uses this layout
+SCHEMA_VERSION = 2
+
+# Dictionary tables: each repeated string is stored once and referenced by an integer id
+DICTIONARY_TABLES = {
+    'Usernames': 'name',
+    'Tickers': 'symbol',
+    'Sources': 'name',
+    'Search_Queries': 'query',
+}
+
+# Compact tables (integer rowids, 8-byte hash keys, integer foreign keys)
+SCHEMA_V2 = """
+    CREATE TABLE IF NOT EXISTS Usernames (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS Tickers (id INTEGER PRIMARY KEY, symbol TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS Sources (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS Search_Queries (id INTEGER PRIMARY KEY, query TEXT NOT NULL UNIQUE);
+
+    CREATE TABLE IF NOT EXISTS Stocktwits_Comments_v2 (
+        id INTEGER PRIMARY KEY,
+        username_id INTEGER REFERENCES Usernames (id),
+        comment_hash BLOB NOT NULL,  -- hash64(Comment), replaces the full-text primary key
+        Comment TEXT,
+        date DATE,
+        sentiment INTEGER CHECK (sentiment BETWEEN 1 AND 5),  -- stored in a single byte
+        ticker_id INTEGER REFERENCES Tickers (id),
+        sentiment_backend TEXT,  -- Backend that produced sentiment (dataset/sentiment.py), NULL if not recorded
+        UNIQUE (username_id, comment_hash)
+    );
+
+    CREATE TABLE IF NOT EXISTS News_v2 (
+        id INTEGER PRIMARY KEY,
+        url_hash BLOB NOT NULL UNIQUE,  -- hash64(URL), replaces the full-text primary key
+        "News Title" TEXT,
+        Date DATE,
+        source_id INTEGER REFERENCES Sources (id),
+        URL TEXT,
+        sentiment INTEGER CHECK (sentiment BETWEEN 1 AND 5),
+        query_id INTEGER REFERENCES Search_Queries (id),
+        sentiment_backend TEXT
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_comments_v2_ticker_date ON Stocktwits_Comments_v2 (ticker_id, date);
+    CREATE INDEX IF NOT EXISTS idx_news_v2_query_date ON News_v2 (query_id, Date);
+"""
+
+# Views with the original table names and columns, so every existing query keeps working
+COMPAT_VIEWS = """
+    CREATE VIEW IF NOT EXISTS Stocktwits_Comments AS
+        SELECT c.id, u.name AS Username, c.Comment, c.date, c.sentiment, t.symbol AS Ticker, c.sentiment_backend
+        FROM Stocktwits_Comments_v2 AS c
+        LEFT JOIN Usernames AS u ON u.id = c.username_id
+        LEFT JOIN Tickers AS t ON t.id = c.ticker_id;
+
+    CREATE VIEW IF NOT EXISTS News AS
+        SELECT n.id, n."News Title", n.Date, s.name AS Source, n.URL, n.sentiment, q.query AS search_query,
+            n.sentiment_backend
+        FROM News_v2 AS n
+        LEFT JOIN Sources AS s ON s.id = n.source_id
+        LEFT JOIN Search_Queries AS q ON q.id = n.query_id;
+"""
+
+# Copies the original tables into the compact layout and replaces them with views. The original
+# tables predate the other backends, so their scores come from the BERT model.
+MIGRATION = """
+    BEGIN IMMEDIATE;
+
+    INSERT OR IGNORE INTO Usernames (name) SELECT DISTINCT Username FROM Stocktwits_Comments WHERE Username IS NOT NULL;
+    INSERT OR IGNORE INTO Tickers (symbol) SELECT DISTINCT Ticker FROM Stocktwits_Comments WHERE Ticker IS NOT NULL;
+    INSERT OR IGNORE INTO Sources (name) SELECT DISTINCT Source FROM News WHERE Source IS NOT NULL;
+    INSERT OR IGNORE INTO Search_Queries (query) SELECT DISTINCT search_query FROM News WHERE search_query IS NOT NULL;
+
+    INSERT OR IGNORE INTO Stocktwits_Comments_v2 (username_id, comment_hash, Comment, date, sentiment, ticker_id, sentiment_backend)
+        SELECT u.id, hash64(c.Comment), c.Comment, c.date, c.sentiment, t.id, 'bert'
+        FROM Stocktwits_Comments AS c
+        LEFT JOIN Usernames AS u ON u.name = c.Username
+        LEFT JOIN Tickers AS t ON t.symbol = c.Ticker
+        ORDER BY c.rowid;
+
+    INSERT OR IGNORE INTO News_v2 (url_hash, "News Title", Date, source_id, URL, sentiment, query_id, sentiment_backend)
+        SELECT hash64(n.URL), n."News Title", n.Date, s.id, n.URL, n.sentiment, q.id, 'bert'
+        FROM News AS n
+        LEFT JOIN Sources AS s ON s.name = n.Source
+        LEFT JOIN Search_Queries AS q ON q.query = n.search_query
+        ORDER BY n.rowid;
+
+    -- The full-text indexes point at the old rowids, so they are rebuilt by db()
+    DROP TABLE IF EXISTS News_fts;
+    DROP TABLE IF EXISTS Stocktwits_Comments_fts;
+    DROP TABLE Stocktwits_Comments;
+    DROP TABLE News;
+
+    {views}
+
+    PRAGMA user_version = {version};
+    COMMIT;
+"""
+
+def hash64(text):
+    """Returns a fixed-width 8-byte hash of the text used as a compact dedup key."""
+    text = '' if text is None else str(text)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+
+def hash64_many(texts):
+    """Returns hash64() of every text, with the per-row lookups hoisted out of the loop."""
+    blake2b = hashlib.blake2b
+    return [blake2b(('' if text is None else str(text)).encode('utf-8'), digest_size=8).digest() for text in texts]
+
+def register_functions(conn):
+    """Makes hash64() available inside SQL statements on this connection."""
+    conn.create_function('hash64', 1, hash64, deterministic=True)
+
+def needs_migration(conn):
+    """Returns True when the database still has the original (v1) tables."""
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = 'Stocktwits_Comments'"
+    ).fetchone()
+    return row is not None and row[0] == 'table'
+
+def migrate(conn, vacuum=True):
+    """Migrates the original tables to the compact layout in place (atomic), then reclaims space."""
+    register_functions(conn)
+    conn.commit()  # executescript needs a clean transaction state
+    conn.executescript(SCHEMA_V2)
+    conn.executescript(MIGRATION.format(views=COMPAT_VIEWS, version=SCHEMA_VERSION))
+    if vacuum:
+        conn.execute("VACUUM")  # Give the space of the dropped tables back to the file system
+
+def add_missing_columns(conn):
+    """Adds columns introduced after a compact database was created, and drops the views to rebuild them."""
+    added = False
+    for table in ('Stocktwits_Comments_v2', 'News_v2'):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if 'sentiment_backend' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN sentiment_backend TEXT")  # Existing scores: not recorded
+            added = True
+    if added:
+        conn.executescript("DROP VIEW IF EXISTS Stocktwits_Comments; DROP VIEW IF EXISTS News;")
+
+def ensure_schema(conn):
+    """Creates the compact layout, migrating the original tables first if they exist."""
+    register_functions(conn)
+    if needs_migration(conn):
+        migrate(conn)
+    else:
+        conn.executescript(SCHEMA_V2)
+        add_missing_columns(conn)
+        conn.executescript(COMPAT_VIEWS + f"PRAGMA user_version = {SCHEMA_VERSION};")
+
+def dictionary_ids(conn, table, values):
+    """Returns {value: id} for the values, adding the ones missing from the dictionary table."""
+    column = DICTIONARY_TABLES[table]
+    values = {v for v in values if v is not None and v == v}  # Drop None and NaN
+    conn.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", [(v,) for v in values])
+    ids = {}
+    values = list(values)
+    for start in range(0, len(values), 500):  # Stay below SQLite's bound-parameter limit
+        chunk = values[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        ids.update(conn.execute(
+            f"SELECT {column}, id FROM {table} WHERE {column} IN ({placeholders})", chunk
+        ).fetchall())
+    return ids
+
+def sentiment_backends(df):
+    """Returns the sentiment_backend column as a list (None where missing, e.g. CSV files saved before it existed)."""
+    if 'sentiment_backend' not in df:
+        return [None] * len(df)
+    return [name if isinstance(name, str) else None for name in df['sentiment_backend'].tolist()]
+
+# A row loaded without a backend keeps the recorded one as long as its score is unchanged
+UPDATE_BACKEND = """sentiment_backend = CASE
+            WHEN excluded.sentiment_backend IS NULL AND sentiment IS excluded.sentiment THEN sentiment_backend
+            ELSE excluded.sentiment_backend END"""
+BACKEND_CHANGED = "(excluded.sentiment_backend IS NOT NULL AND sentiment_backend IS NOT excluded.sentiment_backend)"
+
+def upsert_comments(conn, df):
+    """Inserts or updates StockTwits comments (columns Username, Comment, date, sentiment, Ticker, and
+    optionally sentiment_backend)."""
+    users = dictionary_ids(conn, 'Usernames', df['Username'].tolist())
+    tickers = dictionary_ids(conn, 'Tickers', df['Ticker'].tolist())
+    comments = df['Comment'].tolist()
+    rows = zip(map(users.get, df['Username'].tolist()), hash64_many(comments), comments, df['date'].tolist(),
+               df['sentiment'].tolist(), map(tickers.get, df['Ticker'].tolist()), sentiment_backends(df))
+    # Rows that did not change are left alone instead of being rewritten
+    conn.executemany(f'''
+        INSERT INTO Stocktwits_Comments_v2 (username_id, comment_hash, Comment, date, sentiment, ticker_id, sentiment_backend)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (username_id, comment_hash) DO UPDATE SET
+            date = excluded.date, sentiment = excluded.sentiment, ticker_id = excluded.ticker_id,
+            {UPDATE_BACKEND}
+        WHERE date IS NOT excluded.date OR sentiment IS NOT excluded.sentiment
+            OR ticker_id IS NOT excluded.ticker_id OR {BACKEND_CHANGED}
+    ''', rows)
+
+def upsert_news(conn, df):
+    """Inserts or updates news (columns News Title, Date, Source, URL, sentiment, search_query, and
+    optionally sentiment_backend)."""
+    sources = dictionary_ids(conn, 'Sources', df['Source'].tolist())
+    queries = dictionary_ids(conn, 'Search_Queries', df['search_query'].tolist())
+    urls = df['URL'].tolist()
+    rows = zip(hash64_many(urls), df['News Title'].tolist(), df['Date'].tolist(),
+               map(sources.get, df['Source'].tolist()), urls, df['sentiment'].tolist(),
+               map(queries.get, df['search_query'].tolist()), sentiment_backends(df))
+    conn.executemany(f'''
+        INSERT INTO News_v2 (url_hash, "News Title", Date, source_id, URL, sentiment, query_id, sentiment_backend)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (url_hash) DO UPDATE SET
+            "News Title" = excluded."News Title", Date = excluded.Date, source_id = excluded.source_id,
+            sentiment = excluded.sentiment, query_id = excluded.query_id, {UPDATE_BACKEND}
+        WHERE "News Title" IS NOT excluded."News Title" OR Date IS NOT excluded.Date
+            OR source_id IS NOT excluded.source_id OR sentiment IS NOT excluded.sentiment
+            OR query_id IS NOT excluded.query_id OR {BACKEND_CHANGED}
+    ''', rows)
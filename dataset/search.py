@@ -0,0 +1,78 @@
+import re
+import pandas as pd
+
+# Full-text tables and the columns used to rank, display and aggregate matches
+SEARCH_TABLES = {
+    'News': {
+        'fts': 'News_fts',  # FTS5 index over the news titles
+        'date': 'Date',  # Date column used for the daily sentiment
+        'columns': 'n."News Title", n.Date, n.Source, n.URL, n.sentiment, n.search_query',
+    },
+    'Stocktwits_Comments': {
+        'fts': 'Stocktwits_Comments_fts',  # FTS5 index over the comments
+        'date': 'date',
+        'columns': 'n.Username, n.Comment, n.date, n.sentiment, n.Ticker',
+    },
+}
+
+def build_match_query(search):
+    """Turns free text into an FTS5 query where every word must appear (a trailing * keeps prefix search)."""
+    terms = []
+    for word in search.split():
+        prefix = word.endswith('*')  # Allow "tari*" style prefix searches
+        word = re.sub(r'[^A-Za-z0-9]+', '', word)  # Stored text only keeps letters and digits
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))  # Quote to avoid FTS5 syntax errors
+    return ' '.join(terms)
+
+def lemmatize_search(search, lemmatize):
+    """Replaces each search word by its lemma, as the stored text was saved; prefix searches are kept.
+
+    lemmatize maps a list of words to their lemmas (e.g. spaCy). The index stems words itself, so this
+    is only needed for irregular forms such as "won" -> "win".
+    """
+    words = search.split()
+    lemmas = iter(lemmatize([word for word in words if not word.endswith('*')]))
+    return ' '.join(word if word.endswith('*') else next(lemmas) for word in words)
+
+def count_matches(conn, table, search):
+    """Returns the number of rows in the table that match the search text."""
+    config = SEARCH_TABLES[table]
+    match = build_match_query(search)
+    if not match:
+        return 0
+    query = f"SELECT COUNT(*) FROM {config['fts']} WHERE {config['fts']} MATCH ?"
+    return conn.execute(query, (match,)).fetchone()[0]
+
+def search_matches(conn, table, search, page=1, page_size=20):
+    """Returns one page of matching rows ordered by BM25 relevance (best first)."""
+    config = SEARCH_TABLES[table]
+    match = build_match_query(search)
+    if not match:
+        return pd.DataFrame()
+    query = f"""
+        SELECT {config['columns']}, bm25({config['fts']}) AS rank
+        FROM {config['fts']}
+        JOIN {table} AS n ON n.id = {config['fts']}.rowid
+        WHERE {config['fts']} MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    """
+    offset = (max(page, 1) - 1) * page_size  # Pages are numbered from 1
+    return pd.read_sql_query(query, conn, params=(match, page_size, offset))
+
+def daily_match_sentiment(conn, table, search):
+    """Returns the number of matches and their average sentiment for each day."""
+    config = SEARCH_TABLES[table]
+    match = build_match_query(search)
+    if not match:
+        return pd.DataFrame(columns=['Date', 'matches', 'sentiment'])
+    query = f"""
+        SELECT n.{config['date']} AS Date, COUNT(*) AS matches, AVG(n.sentiment) AS sentiment
+        FROM {config['fts']}
+        JOIN {table} AS n ON n.id = {config['fts']}.rowid
+        WHERE {config['fts']} MATCH ?
+        GROUP BY n.{config['date']}
+        ORDER BY n.{config['date']}
+    """
+    return pd.read_sql_query(query, conn, params=(match,))
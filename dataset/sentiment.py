@@ -0,0 +1,187 @@
+import hashlib
+import json
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+
+# Model behind the original (and default) sentiment scores
+TRANSFORMER_MODEL = 'nlptown/bert-base-multilingual-uncased-sentiment'
+
+# Word weights for the lexicon scorer, from -3 (very negative) to +3 (very positive). The text it
+# scores is already cleaned and lemmatized, so base forms are listed; market slang is included.
+LEXICON = {
+    # Strongly positive
+    'amazing': 3, 'awesome': 3, 'excellent': 3, 'fantastic': 3, 'love': 3, 'moon': 3, 'outstanding': 3,
+    'perfect': 3, 'rocket': 3, 'skyrocket': 3, 'soar': 3, 'superb': 3, 'wonderful': 3, 'brilliant': 3,
+    'landslide': 2, 'breakout': 2, 'rally': 2, 'surge': 2, 'boom': 2, 'record': 1, 'squeeze': 2,
+    # Positive
+    'good': 2, 'great': 2, 'win': 2, 'winner': 2, 'winning': 2, 'happy': 2, 'best': 2, 'beautiful': 2,
+    'strong': 2, 'profit': 2, 'gain': 2, 'bull': 2, 'buy': 1, 'long': 1, 'up': 1, 'rise': 2, 'green': 1,
+    'growth': 2, 'grow': 1, 'success': 2, 'successful': 2, 'support': 1, 'thank': 2, 'thanks': 2,
+    'nice': 2, 'cool': 1, 'lol': 1, 'haha': 1, 'like': 1, 'hope': 1, 'hopeful': 2, 'confident': 2,
+    'easy': 1, 'free': 1, 'safe': 1, 'save': 1, 'agree': 1, 'benefit': 2, 'better': 2, 'bright': 1,
+    'celebrate': 2, 'congrats': 2, 'congratulation': 2, 'fun': 2, 'glad': 2, 'honest': 2, 'improve': 2,
+    'interesting': 1, 'recover': 2, 'recovery': 2, 'rich': 1, 'smart': 2, 'solid': 2, 'strength': 2,
+    'true': 1, 'truth': 1, 'trust': 1, 'upside': 2, 'undervalue': 2, 'hold': 1, 'hodl': 2, 'pump': 1,
+    'peace': 2, 'proud': 2, 'respect': 2, 'yes': 1, 'yay': 2, 'wow': 1, 'god': 1, 'bless': 2,
+    'help': 1, 'positive': 2, 'fair': 1, 'fine': 1, 'calm': 1, 'strongly': 1, 'beat': 1, 'gem': 2,
+    # Negative
+    'bad': -2, 'lose': -2, 'loser': -3, 'loss': -2, 'sell': -1, 'short': -1, 'down': -1, 'drop': -2,
+    'fall': -2, 'crash': -3, 'dump': -2, 'tank': -2, 'plunge': -3, 'collapse': -3, 'bear': -2,
+    'bearish': -2, 'red': -1, 'weak': -2, 'worse': -2, 'worst': -3, 'fail': -2, 'failure': -3,
+    'lie': -2, 'liar': -3, 'fake': -2, 'fraud': -3, 'scam': -3, 'corrupt': -3, 'criminal': -3,
+    'crime': -2, 'steal': -2, 'cheat': -2, 'illegal': -2, 'hate': -3, 'angry': -2, 'afraid': -2,
+    'fear': -2, 'scare': -2, 'worry': -2, 'sad': -2, 'sorry': -1, 'problem': -1, 'risk': -1,
+    'danger': -2, 'dangerous': -2, 'threat': -2, 'kill': -3, 'death': -2, 'die': -2, 'dead': -2,
+    'war': -2, 'attack': -2, 'destroy': -3, 'disaster': -3, 'terrible': -3, 'horrible': -3,
+    'awful': -3, 'pathetic': -3, 'stupid': -3, 'dumb': -3, 'idiot': -3, 'moron': -3, 'clown': -2,
+    'crazy': -2, 'insane': -2, 'joke': -2, 'cult': -2, 'trash': -3, 'garbage': -3, 'shit': -3,
+    'fuck': -3, 'damn': -2, 'hell': -2, 'suck': -2, 'ugly': -2, 'poor': -2, 'broke': -2,
+    'bankrupt': -3, 'bankruptcy': -3, 'debt': -1, 'dilution': -2, 'dilute': -2, 'overvalue': -2,
+    'bubble': -2, 'bagholder': -3, 'bag': -1, 'rug': -2, 'puts': -1, 'wrong': -2, 'blame': -2,
+    'problematic': -2, 'chaos': -2, 'crisis': -2, 'hurt': -2, 'pain': -2, 'evil': -3, 'racist': -3,
+    'traitor': -3, 'treason': -3, 'indict': -2, 'indictment': -2, 'guilty': -2, 'convict': -2,
+    'prison': -2, 'jail': -2, 'sue': -1, 'lawsuit': -2, 'investigation': -1, 'warn': -1,
+    'warning': -1, 'concern': -1, 'doubt': -1, 'downside': -2, 'slump': -2, 'decline': -2,
+    'low': -1, 'negative': -2, 'unfair': -2, 'useless': -2, 'waste': -2, 'nonsense': -2,
+    'lmao': -1, 'ridiculous': -2, 'shame': -2, 'disgrace': -3, 'disgusting': -3, 'weird': -1,
+    'against': -1, 'cry': -2, 'miss': -1, 'mess': -2, 'sick': -2, 'toxic': -3, 'broken': -2,
+}
+
+# Words that flip the sign of the next sentiment word within a short window
+NEGATIONS = {'not', 'no', 'never', 'dont', 'doesnt', 'didnt', 'cant', 'cannot', 'wont', 'isnt',
+             'arent', 'wasnt', 'without', 'nothing', 'neither', 'nor', 'hardly'}
+NEGATION_WINDOW = 3  # Words after a negation that it still applies to
+
+# Smoothing of the summed weights into [-1, 1] (as in VADER) and the cut points onto the 1-5 scale.
+# The cuts are quantile-matched to the BERT scores stored for the bundled comments and headlines
+# (python -m dataset.benchmark_sentiment --calibrate), so both backends give similar score mixes.
+NORMALIZE_ALPHA = 15
+SCALE_CUTS = (-0.125, 0.125, 0.354, 0.536)  # compound < cut[0] -> 1, ..., compound >= cut[3] -> 5
+
+class SentimentBackend(ABC):
+    """Scores texts on the 1 (most negative) to 5 (most positive) scale used throughout the app."""
+
+    name = None
+    description = None
+
+    @property
+    @abstractmethod
+    def version(self):
+        """Returns a string that changes whenever the backend would score the same text differently."""
+
+    @abstractmethod
+    def score(self, texts):
+        """Returns an int8 array with one score (1-5) per text."""
+
+class TransformerBackend(SentimentBackend):
+    """The original BERT model (nlptown), run on padded batches without gradients."""
+
+    name = 'bert'
+    description = "BERT (nlptown, most accurate, slow)"
+
+    def __init__(self, model_name=TRANSFORMER_MODEL, batch_size=32, max_length=512):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tokenizer = None
+        self.model = None
+
+    @property
+    def version(self):
+        return self.model_name
+
+    def load(self):
+        """Loads the tokenizer and model on first use (imported here so the lexicon tier needs no torch)."""
+        if self.model is None:
+            from transformers import AutoModelForSequenceClassification, AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self.model.eval()
+        return self.tokenizer, self.model
+
+    def score(self, texts):
+        import torch
+        tokenizer, model = self.load()
+        scores = np.empty(len(texts), dtype=np.int8)
+        for start in range(0, len(texts), self.batch_size):
+            batch = [str(text) for text in texts[start:start + self.batch_size]]
+            inputs = tokenizer(batch, return_tensors='pt', truncation=True, max_length=self.max_length, padding=True)
+            with torch.no_grad():
+                outputs = model(**inputs)
+            scores[start:start + len(batch)] = (torch.argmax(outputs.logits, dim=1) + 1).numpy()
+        return scores
+
+class LexiconBackend(SentimentBackend):
+    """Fast rule-based scorer: sums word weights (with negation), then maps the total onto 1-5.
+
+    Fully local with no model to load; scores about a million short comments in a few seconds.
+    """
+
+    name = 'lexicon'
+    description = "Lexicon (rule-based, fast, approximate)"
+
+    def __init__(self, lexicon=LEXICON, negations=NEGATIONS):
+        self.lexicon = lexicon
+        self.negations = negations
+
+    @property
+    def version(self):
+        """Returns a short hash of the word weights, negations and scale parameters."""
+        settings = json.dumps([self.lexicon, sorted(self.negations), NEGATION_WINDOW, NORMALIZE_ALPHA, SCALE_CUTS],
+                              sort_keys=True)
+        return hashlib.sha1(settings.encode()).hexdigest()[:8]
+
+    def raw_scores(self, texts):
+        """Returns the summed word weights of every text as a float array."""
+        get, negations = self.lexicon.get, self.negations
+        totals = np.zeros(len(texts))
+        for i, text in enumerate(texts):
+            if not isinstance(text, str):
+                continue
+            words = text.lower().split()
+            if negations.isdisjoint(words):
+                totals[i] = sum(get(word, 0) for word in words)  # Common case: plain sum
+                continue
+            total, negate_left = 0, 0
+            for word in words:
+                if word in negations:
+                    negate_left = NEGATION_WINDOW
+                    continue
+                weight = get(word)
+                if weight:
+                    total += -weight if negate_left else weight
+                    negate_left = 0
+                elif negate_left:
+                    negate_left -= 1
+            totals[i] = total
+        return totals
+
+    def compound_scores(self, texts):
+        """Returns the summed weights squashed into [-1, 1], before they are cut onto the 1-5 scale."""
+        totals = self.raw_scores(texts)
+        return totals / np.sqrt(totals ** 2 + NORMALIZE_ALPHA)
+
+    def score(self, texts):
+        return (np.searchsorted(SCALE_CUTS, self.compound_scores(texts), side='right') + 1).astype(np.int8)
+
+# Backends selectable by name (pages, jobs and command lines)
+BACKENDS = {
+    'bert': TransformerBackend,
+    'lexicon': LexiconBackend,
+}
+DEFAULT_BACKEND = 'bert'
+
+_backends = {}  # Loaded backends, one per name and process (the BERT model is large)
+_backends_lock = threading.Lock()
+
+def get_backend(name=DEFAULT_BACKEND):
+    """Returns the shared instance of a backend, creating it on first use."""
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
+
+def backend_label(name):
+    """Returns the text shown for a backend in the page selectors."""
+    return BACKENDS[name].description
@@ -0,0 +1,169 @@
+import json
+import time
+import numpy as np
+import pandas as pd
+from dataset.data_access import reader, writer
+from dataset.schema_v2 import ensure_schema
+
+# Documents inferred per call to the model (one matrix operation per chunk)
+INFERENCE_CHUNK_SIZE = 2000
+
+# Stored tables a model can be applied to, with the columns used to filter and aggregate them
+TOPIC_SOURCES = {
+    'news': {
+        'table': 'News_v2',
+        'text': '"News Title"',
+        'date': 'Date',
+        'filter': 'query_id = (SELECT id FROM Search_Queries WHERE query = ?)',  # Search query
+    },
+    'comments': {
+        'table': 'Stocktwits_Comments_v2',
+        'text': 'Comment',
+        'date': 'date',
+        'filter': 'ticker_id = (SELECT id FROM Tickers WHERE symbol = ?)',  # Ticker
+    },
+}
+
+# One row per model whose assignments are stored, and one row per (model, document)
+TOPIC_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Topic_Models (
+        id INTEGER PRIMARY KEY,
+        fingerprint TEXT NOT NULL UNIQUE,  -- Hash of the topic-word matrix
+        source TEXT NOT NULL,  -- Key of TOPIC_SOURCES
+        num_topics INTEGER NOT NULL,
+        topic_words TEXT,  -- JSON list with the top words of each topic
+        created_at REAL,
+        complete INTEGER NOT NULL DEFAULT 0  -- 1 once every document has been assigned
+    );
+
+    CREATE TABLE IF NOT EXISTS Document_Topics (
+        model_id INTEGER NOT NULL REFERENCES Topic_Models (id),
+        doc_id INTEGER NOT NULL,  -- id in the source table
+        topic INTEGER NOT NULL,  -- Dominant topic (0-based)
+        weight REAL NOT NULL,  -- Share of the dominant topic
+        weights BLOB,  -- Full topic distribution as float32 values
+        PRIMARY KEY (model_id, doc_id)
+    ) WITHOUT ROWID;
+
+    CREATE INDEX IF NOT EXISTS idx_document_topics_topic ON Document_Topics (model_id, topic);
+"""
+
+def ensure_topic_tables(conn):
+    """Creates the topic tables if they do not exist yet, adding columns missing from older versions."""
+    conn.executescript(TOPIC_SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(Topic_Models)")}
+    if 'complete' not in columns:
+        # Models saved before the flag existed were finished runs
+        conn.execute("ALTER TABLE Topic_Models ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+
+def register_model(conn, fingerprint, source, lda_model):
+    """Stores a model's description and returns its id, removing assignments from an earlier run.
+
+    The model stays marked incomplete (hidden from list_topic_models) until assign_topics finishes.
+    """
+    topic_words = [[word for word, _ in lda_model.show_topic(i, 5)] for i in range(lda_model.num_topics)]
+    conn.execute("""
+        INSERT INTO Topic_Models (fingerprint, source, num_topics, topic_words, created_at, complete)
+        VALUES (?, ?, ?, ?, ?, 0)
+        ON CONFLICT (fingerprint) DO UPDATE SET source = excluded.source, created_at = excluded.created_at, complete = 0
+    """, (fingerprint, source, lda_model.num_topics, json.dumps(topic_words), time.time()))
+    model_id = conn.execute("SELECT id FROM Topic_Models WHERE fingerprint = ?", (fingerprint,)).fetchone()[0]
+    conn.execute("DELETE FROM Document_Topics WHERE model_id = ?", (model_id,))
+    return model_id
+
+def infer_topics(lda_model, bows):
+    """Returns the normalized topic distribution of every document as one (documents x topics) array."""
+    gamma, _ = lda_model.inference(bows)  # Variational inference over the whole chunk at once
+    return (gamma / gamma.sum(axis=1, keepdims=True)).astype(np.float32)
+
+def assign_topics(lda_model, fingerprint, source, tokenize, chunksize=INFERENCE_CHUNK_SIZE, job=None):
+    """Infers the topics of every stored document of a source and writes them to Document_Topics.
+
+    Documents are read in id order, chunksize at a time, and each chunk is written in its own
+    transaction. Documents without any word known to the model are skipped. If the run is
+    cancelled or fails, the rows written so far are removed. Returns the model id and the number
+    of documents assigned.
+    """
+    config = TOPIC_SOURCES[source]
+    with writer() as conn:
+        ensure_schema(conn)  # Document ids refer to the compact (v2) tables
+        ensure_topic_tables(conn)
+        model_id = register_model(conn, fingerprint, source, lda_model)
+    with reader() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM {config['table']}").fetchone()[0]
+
+    try:
+        assigned = _assign_chunks(lda_model, model_id, config, tokenize, chunksize, total, job)
+    except BaseException:
+        # Cancelled (JobCancelled) or failed: drop the partial assignments of this model
+        with writer() as conn:
+            conn.execute("DELETE FROM Document_Topics WHERE model_id = ?", (model_id,))
+        raise
+    with writer() as conn:
+        conn.execute("UPDATE Topic_Models SET complete = 1 WHERE id = ?", (model_id,))
+    return model_id, assigned
+
+def _assign_chunks(lda_model, model_id, config, tokenize, chunksize, total, job=None):
+    """Writes the topics of every document of a source chunk by chunk; returns the number assigned."""
+    last_id, done, assigned = 0, 0, 0
+    while True:
+        # Keyset pagination: every chunk is a short read on the id index
+        with reader() as conn:
+            rows = conn.execute(
+                f"SELECT id, {config['text']} FROM {config['table']} WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, chunksize)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        done += len(rows)
+
+        bows = [lda_model.id2word.doc2bow(tokenize(text or '')) for _, text in rows]
+        keep = [i for i, bow in enumerate(bows) if bow]
+        if keep:
+            weights = infer_topics(lda_model, [bows[i] for i in keep])
+            topics = weights.argmax(axis=1)
+            records = [
+                (model_id, rows[i][0], int(topic), float(row[topic]), row.tobytes())
+                for i, topic, row in zip(keep, topics, weights)
+            ]
+            with writer() as conn:
+                conn.executemany("INSERT OR REPLACE INTO Document_Topics VALUES (?, ?, ?, ?, ?)", records)
+            assigned += len(records)
+
+        if job:
+            job.progress(done / max(total, 1), f"Assigned topics to {assigned} of {total} documents")
+    return assigned
+
+def list_topic_models(conn, source=None):
+    """Returns the topic models whose assignments are complete (newest first), or an empty DataFrame."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'Topic_Models'").fetchone() is None:
+        return pd.DataFrame(columns=['id', 'source', 'num_topics', 'topic_words', 'created_at'])
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(Topic_Models)")}
+    complete = "complete = 1" if 'complete' in columns else "1"  # Tables from before the flag hold only finished runs
+    query = f"SELECT id, source, num_topics, topic_words, created_at FROM Topic_Models WHERE {complete}"
+    params = ()
+    if source:
+        query += " AND source = ?"
+        params = (source,)
+    models = pd.read_sql_query(query + " ORDER BY created_at DESC", conn, params=params)
+    models['topic_words'] = models['topic_words'].map(json.loads)
+    return models
+
+def daily_topic_sentiment(conn, model_id, source, key=None):
+    """Returns the average sentiment and document count per day and dominant topic in one query.
+
+    key filters the documents by search query (news) or ticker (comments).
+    """
+    config = TOPIC_SOURCES[source]
+    where = f"AND d.{config['filter']}" if key else ''
+    query = f"""
+        SELECT d.{config['date']} AS Date, t.topic, AVG(d.sentiment) AS sentiment, COUNT(*) AS documents
+        FROM Document_Topics AS t
+        JOIN {config['table']} AS d ON d.id = t.doc_id
+        WHERE t.model_id = ? {where}
+        GROUP BY d.{config['date']}, t.topic
+        ORDER BY Date, t.topic
+    """
+    df = pd.read_sql_query(query, conn, params=(model_id, key) if key else (model_id,))
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df
@@ -0,0 +1,208 @@
+import argparse
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from dataset.indicators import IndicatorEngine, append_bars, stock_file_paths
+
+# Tickers refreshed by default, one per line
+WATCHLIST_PATH = 'dataset/watchlist.txt'
+
+# Tickers requested per provider call, and provider calls running at once
+BATCH_SIZE = 50
+MAX_WORKERS = 4
+
+NO_DATA = "No data returned"
+
+class YahooProvider:
+    """Downloads daily bars from Yahoo Finance, many tickers per request."""
+
+    def fetch(self, tickers, start, end):
+        """Returns {ticker: bars} for the tickers that have data between start and end (exclusive)."""
+        import yfinance as yf
+        data = yf.download(tickers, start=start, end=end, group_by='ticker', threads=False, progress=False)
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: data}  # Single ticker without a ticker level
+        return {ticker: data[ticker] for ticker in tickers if ticker in data.columns.get_level_values(0)}
+
+class FakePriceProvider:
+    """Generates repeatable price bars locally, for testing without network access.
+
+    A batch that contains a ticker listed in fail raises, like a failed request would; calls
+    records every batch that was requested.
+    """
+
+    def __init__(self, fail=(), delay=0.0):
+        self.fail = set(fail)
+        self.delay = delay  # Seconds per call, to imitate network latency
+        self.calls = []
+
+    def fetch(self, tickers, start, end):
+        self.calls.append(list(tickers))
+        time.sleep(self.delay)
+        failed = self.fail.intersection(tickers)
+        if failed:
+            raise ConnectionError(f"Request failed for {sorted(failed)}")
+
+        index = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+        frames = {}
+        days = (index - pd.Timestamp('2000-01-01')).days.to_numpy()
+        for ticker in tickers:
+            # A function of ticker and date only, so overlapping requests return the same bars
+            seed = zlib.crc32(ticker.encode())
+            close = 50 + seed % 100 + 10 * np.sin(days / 15 + seed) + 3 * np.sin(days / 3.7 + seed / 7)
+            frames[ticker] = pd.DataFrame({
+                'Open': close - 0.2, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                'Adj Close': close, 'Volume': np.full(len(index), 1_000_000),
+            }, index=index)
+        return frames
+
+# Price providers selectable by name (page and command line)
+PROVIDERS = {
+    'yahoo': YahooProvider,
+    'fake': FakePriceProvider,
+}
+
+def read_watchlist(path=WATCHLIST_PATH):
+    """Returns the tickers listed in a watchlist file, or an empty list if there is none."""
+    try:
+        with open(path) as f:
+            return parse_tickers(f.read())
+    except FileNotFoundError:
+        return []
+
+def parse_tickers(text):
+    """Splits text on whitespace and commas into unique upper-case tickers, keeping their order."""
+    tickers = text.replace(',', ' ').upper().split()
+    return list(dict.fromkeys(tickers))
+
+def next_start(ticker, default_start, folder='dataset/stock'):
+    """Returns the day after the last stored bar of a ticker, or default_start if nothing is stored."""
+    _, state_path = stock_file_paths(ticker, folder)
+    engine = IndicatorEngine.load(state_path)
+    if engine and engine.state['last_date']:
+        return date.fromisoformat(engine.state['last_date']) + timedelta(days=1)
+    return default_start
+
+def plan_batches(starts, batch_size=BATCH_SIZE):
+    """Groups tickers that need the same start date ({ticker: start}) into batches of at most batch_size."""
+    groups = {}
+    for ticker, start in starts.items():
+        groups.setdefault(start, []).append(ticker)
+    return [(start, group[i:i + batch_size])
+            for start, group in sorted(groups.items())
+            for i in range(0, len(group), batch_size)]
+
+def fetch_frames(provider, tickers, start, end):
+    """Fetches tickers in one request; if it fails, splits the batch in halves and retries each.
+
+    A bad ticker therefore costs about 2 * log2(batch size) extra requests, not one per ticker.
+    Returns ({ticker: frame}, {ticker: error message}).
+    """
+    try:
+        return provider.fetch(tickers, start, end), {}
+    except Exception as e:
+        if len(tickers) == 1:
+            return {}, {tickers[0]: str(e)}
+    frames, errors = {}, {}
+    half = len(tickers) // 2
+    for part in (tickers[:half], tickers[half:]):
+        part_frames, part_errors = fetch_frames(provider, part, start, end)
+        frames.update(part_frames)
+        errors.update(part_errors)
+    return frames, errors
+
+def fetch_batch(provider, tickers, start, end):
+    """Fetches one batch and returns ({ticker: bars}, {ticker: error message}).
+
+    Errors are kept per ticker, so one bad ticker never fails the rest of its batch.
+    """
+    frames, errors = fetch_frames(provider, tickers, start, end)
+    bars = {}
+    for ticker in tickers:
+        frame = frames.get(ticker)
+        frame = frame.dropna(how='all') if frame is not None else None
+        if frame is None or frame.empty:
+            errors.setdefault(ticker, NO_DATA)
+        else:
+            bars[ticker] = frame
+    return bars, errors
+
+def refresh_watchlist(tickers, default_start, end=None, provider=None, batch_size=BATCH_SIZE,
+                      workers=MAX_WORKERS, folder='dataset/stock', job=None):
+    """Brings the stored prices of every ticker up to date and returns a summary per ticker.
+
+    Batches are fetched concurrently by a bounded thread pool (the requests wait on the network,
+    not the CPU). Nothing is written until every batch is back; then all new bars are appended in
+    one pass through the incremental indicator engine.
+    """
+    provider = provider or YahooProvider()
+    end = end or date.today() + timedelta(days=1)  # End date is exclusive
+    starts = {ticker: next_start(ticker, default_start, folder) for ticker in tickers}
+    batches = [(start, batch) for start, batch in plan_batches(starts, batch_size) if start < end]
+    started = time.perf_counter()
+
+    fetched, errors = {}, {}
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(fetch_batch, provider, batch, start, end): batch for start, batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            batch = futures[future]
+            try:
+                bars, batch_errors = future.result()
+            except Exception as e:
+                bars, batch_errors = {}, {ticker: str(e) for ticker in batch}
+            fetched.update(bars)
+            errors.update(batch_errors)
+            if job:
+                job.progress(0.9 * done / len(batches), f"Fetched {done} of {len(batches)} batches")
+                job.check_cancelled()
+    finally:
+        pool.shutdown(cancel_futures=True)  # On cancel (or an error), queued batches are never requested
+
+    # A ticker with stored prices and no newer bars is simply up to date
+    for ticker, start in starts.items():
+        if start != default_start and errors.get(ticker) == NO_DATA:
+            del errors[ticker]
+
+    # Single write pass once everything is fetched
+    if job:
+        job.progress(0.9, f"Saving {len(fetched)} tickers")
+    written = {}
+    for ticker, bars in fetched.items():
+        try:
+            written[ticker] = append_bars(ticker, bars, folder)
+        except Exception as e:
+            errors[ticker] = f"Could not save: {e}"
+
+    summary = pd.DataFrame({
+        'Ticker': tickers,
+        'New bars': [written.get(ticker, 0) for ticker in tickers],
+        'Error': [errors.get(ticker, '') for ticker in tickers],
+    })
+    summary.attrs['seconds'] = time.perf_counter() - started
+    summary.attrs['requests'] = len(batches)
+    return summary
+
+def refresh_watchlist_job(job, tickers, start, provider='yahoo'):
+    """Background job entry point for 'Refresh Watchlist' (see dataset/jobs.py)."""
+    return refresh_watchlist(tickers, date.fromisoformat(start), provider=PROVIDERS[provider](), job=job)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the latest prices of every ticker on a watchlist.")
+    parser.add_argument('tickers', nargs='*', help=f"Tickers to refresh (default: the tickers in {WATCHLIST_PATH})")
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today() - timedelta(days=365),
+                        help="First date for tickers with no stored prices (YYYY-MM-DD)")
+    parser.add_argument('--provider', choices=PROVIDERS, default='yahoo')
+    parser.add_argument('--folder', default='dataset/stock', help="Folder of the price CSV files")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    summary = refresh_watchlist(args.tickers or read_watchlist(), args.start, provider=PROVIDERS[args.provider](),
+                                batch_size=args.batch_size, workers=args.workers, folder=args.folder)
+    print(summary.to_string(index=False))
+    print(f"\n{summary['New bars'].sum()} bars for {(summary['Error'] == '').sum()} of {len(summary)} tickers "
+          f"in {summary.attrs['requests']} requests, {summary.attrs['seconds']:.1f}s")
@@ -4,7 +4,8 @@ from app_page.news_scraper_sentiment_analysis import main as news_scraper_main
 from app_page.stock_data_fetcher import main as stock_data_fetcher_main
 from app_page.stocktwits_comment_sentiment_analysis import main as stocktwit_analysis_main
 from app_page.topic_modeling_lda_analysis import lda_workflow
-import dataset.database as db
+from app_page.full_text_search import main as full_text_search_main
+from app_page.job_status import show_job, submit_job
 import app_page.welcome as welcome
 import app_page.sentiment_report as r
 
@@ -28,11 +29,15 @@ def main():
                                        "Stock Data Fetcher", 
                                        "StockTwits Comment Sentiment Analysis", 
                                        "Topic Modeling LDA Analysis",
-                                       "Sentiment Report"])
+                                       "Sentiment Report",
+                                       "Full-Text Search"])
 
     if st.sidebar.button("Update Database"):
-        db.db()  # Call the update_database function
-        st.sidebar.success("Database updated successfully!")  # Success message
+        submit_job('update_database', {}, force=True)  # Run the update in a background worker
+
+    # Show the progress of the update in the sidebar (also after a browser refresh)
+    with st.sidebar:
+        show_job('update_database', st.success)  # Success message
 
     # Display the welcome page first
     if app_mode == "Welcome":
@@ -51,6 +56,8 @@ def main():
         lda_workflow()  # Calls the LDA workflow function for Topic Modeling
     elif app_mode == "Sentiment Report":
         r.main()
+    elif app_mode == "Full-Text Search":
+        full_text_search_main()  # Calls the main function of Full-Text Search
 
 if __name__ == "__main__":
     # Run the main function when the script is executed
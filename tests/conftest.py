@@ -0,0 +1,44 @@
+import sqlite3
+import pytest
+import dataset.data_access as data_access
+from dataset.jobs import JobCancelled
+from dataset.schema_v2 import ensure_schema
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    """Points the shared connections at an empty database with the compact schema and yields its path."""
+    data_access.close_connections()
+    path = str(tmp_path / 'TrendTeller.db')
+    monkeypatch.setattr(data_access, 'DB_PATH', path)
+    with data_access.writer() as conn:
+        ensure_schema(conn)
+    yield path
+    data_access.close_connections()
+
+@pytest.fixture
+def conn():
+    """Yields an in-memory connection with the compact schema."""
+    conn = sqlite3.connect(':memory:')
+    ensure_schema(conn)
+    yield conn
+    conn.close()
+
+class CancelAfter:
+    """Stands in for a job's JobContext; the job is cancelled once `reports` progress reports were made."""
+
+    def __init__(self, reports):
+        self.reports = reports
+        self.reported = 0
+
+    def progress(self, fraction, message=None, partial=None):
+        self.reported += 1
+        self.check_cancelled()  # As JobContext.progress does
+
+    def check_cancelled(self):
+        if self.reported >= self.reports:
+            raise JobCancelled()
+
+@pytest.fixture
+def cancel_after():
+    """Returns the CancelAfter class, for tasks that should see a cancel after a number of progress reports."""
+    return CancelAfter
@@ -0,0 +1,28 @@
+from dataset import backfill, sentiment
+from dataset.data_access import reader, writer
+
+def add_comments(count):
+    with writer() as conn:
+        conn.executescript(backfill.BACKFILL_SCHEMA)
+        conn.executemany("INSERT INTO Stocktwits_Comments_v2 (comment_hash, Comment) VALUES (?, ?)",
+                         [(bytes([i]), 'great rally' if i % 2 else 'bad crash') for i in range(count)])
+
+def test_shard_ending_in_deleted_rows_is_finished(temp_db):
+    add_comments(10)
+    with writer() as conn:
+        shard, first_id, last_id, last_done, _ = backfill.plan_shards(conn, 'comments', 'run', 1)[0]
+        conn.execute("DELETE FROM Stocktwits_Comments_v2 WHERE id > 7")
+
+    assert backfill.rescore_shard('comments', 'lexicon', 'run', shard, last_id, last_done, batch_size=4) == 7
+    assert backfill.progress('run') == (7, 1, 1)
+    with reader() as conn:
+        assert conn.execute("SELECT last_done FROM Backfill_Shards").fetchone() == (10,)
+        scored = conn.execute("SELECT DISTINCT sentiment_backend FROM Stocktwits_Comments_v2").fetchall()
+    assert scored == [('lexicon',)]
+
+def test_run_key_changes_with_the_model(monkeypatch):
+    key = backfill.run_key('comments', 'lexicon')
+    assert key.startswith('comments-lexicon-')
+    monkeypatch.setattr(sentiment, 'SCALE_CUTS', (-0.5, -0.05, 0.05, 0.5))
+    assert backfill.run_key('comments', 'lexicon') != key
+    assert backfill.run_key('comments', 'bert') == f'comments-bert-{sentiment.TRANSFORMER_MODEL}'
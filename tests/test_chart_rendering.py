@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import pytest
+import app_page.chart_rendering as chart_rendering
+from app_page.chart_rendering import downsample_series, fingerprint, lttb, ohlc_rule, resample_ohlc
+
+def test_fingerprint_depends_on_row_order():
+    df = pd.DataFrame({'Date': pd.date_range('2024-01-01', periods=3), 'sentiment': [1, 2, 3]})
+    assert fingerprint(df) == fingerprint(df.copy())
+    assert fingerprint(df) != fingerprint(df.iloc[::-1])
+    assert fingerprint(df) != fingerprint(df.iloc[::-1].reset_index(drop=True))
+    assert fingerprint(df) != fingerprint(df.assign(sentiment=[1, 2, 4]))
+    assert fingerprint(df, df) != fingerprint(df)
+
+@pytest.mark.parametrize('n, n_out', [(1000, 100), (101, 100), (10, 3)])
+def test_lttb_keeps_end_points_in_order(n, n_out):
+    rng = np.random.default_rng(0)
+    keep = lttb(np.arange(n), rng.normal(size=n).cumsum(), n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert (np.diff(keep) > 0).all()
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(1000)
+    y[537] = 10
+    assert 537 in lttb(np.arange(1000), y, 50)
+
+def test_lttb_returns_every_point_when_few():
+    assert lttb(np.arange(10), np.arange(10), 50).tolist() == list(range(10))
+
+def test_downsample_series_with_dates():
+    df = pd.DataFrame({'Date': pd.date_range('2020-01-01', periods=2000), 'sentiment': np.sin(np.arange(2000) / 50)})
+    sampled = downsample_series(df, 'Date', 'sentiment', n_out=200)
+    assert len(sampled) == 200
+    assert sampled['Date'].is_monotonic_increasing
+    assert sampled['Date'].iloc[[0, -1]].tolist() == df['Date'].iloc[[0, -1]].tolist()
+
+@pytest.mark.parametrize('num_bars, rule', [(500, None), (501, 'W-FRI'), (2500, 'W-FRI'), (2501, 'ME')])
+def test_ohlc_rule(num_bars, rule):
+    assert ohlc_rule(num_bars) == rule
+
+def bars():
+    index = pd.bdate_range('2024-01-01', '2024-02-29', name='Date')  # Monday to Thursday
+    close = np.arange(len(index), dtype=float)
+    return pd.DataFrame({'Open': close + 0.5, 'High': close + 1, 'Low': close - 1, 'Close': close,
+                         'Volume': np.full(len(index), 10)}, index=index)
+
+def test_resample_ohlc_weekly():
+    weekly = resample_ohlc(bars(), 'W-FRI')
+    assert weekly.index[0] == pd.Timestamp('2024-01-05')  # Weeks end on Friday
+    assert weekly.iloc[0].tolist() == [0.5, 5.0, -1.0, 4.0, 50]
+    assert weekly.index[-1] == pd.Timestamp('2024-03-01')  # The last partial week
+    assert weekly['Volume'].sum() == 10 * len(bars())
+
+def test_resample_ohlc_monthly():
+    monthly = resample_ohlc(bars(), 'ME')
+    assert monthly.index.tolist() == [pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-29')]
+    january = bars().loc['2024-01']
+    assert monthly.iloc[0].tolist() == [january['Open'].iloc[0], january['High'].max(), january['Low'].min(),
+                                        january['Close'].iloc[-1], january['Volume'].sum()]
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Renders word clouds in threads with a stand-in renderer and records every (words, title) rendered."""
+    rendered = []
+    def render(words, title):
+        rendered.append((words, title))
+        return f'{title}: {sorted(words)}'.encode()
+    monkeypatch.setattr(chart_rendering, '_cache', OrderedDict())
+    monkeypatch.setattr(chart_rendering, '_get_render_pool', lambda: ThreadPoolExecutor(2))
+    monkeypatch.setattr(chart_rendering, 'render_word_cloud', render)
+    return rendered
+
+def test_word_clouds_are_cached_per_model_topic_and_size(renders):
+    topics = {1: {'rally': 0.6}, 0: {'crash': 0.4}}
+    images = chart_rendering.word_cloud_images('model-a', topics, 200)
+    assert images == [b"Topic 1: ['crash']", b"Topic 2: ['rally']"]  # In topic order
+    assert len(renders) == 2
+
+    assert chart_rendering.word_cloud_images('model-a', topics, 200) == images
+    assert len(renders) == 2  # Both from the cache
+
+    chart_rendering.word_cloud_images('model-a', topics, 50)
+    chart_rendering.word_cloud_images('model-b', {0: {'crash': 0.4}}, 200)
+    assert len(renders) == 5  # Another size or model is rendered again
@@ -0,0 +1,53 @@
+import os
+import pandas as pd
+import pytest
+
+try:
+    import app_page.stocktwits_comment_sentiment_analysis as page
+except (ImportError, OSError) as e:  # spaCy or its English model is missing
+    pytest.skip(f"StockTwits page cannot be imported: {e}", allow_module_level=True)
+
+ROWS = 2500
+
+@pytest.fixture(autouse=True)
+def no_lemmatizer(monkeypatch):
+    # Lemmas do not matter for the resume logic; keep the test independent of the spaCy model
+    monkeypatch.setattr(page, 'lemmatize_comments', lambda comments, batch_size=256: comments)
+
+def write_upload(path):
+    pd.DataFrame({
+        'Username': [f'user{i}' for i in range(ROWS)],
+        'Comment': [f'comment number {i} {"great" if i % 3 else "terrible"}' for i in range(ROWS)],
+    }).to_csv(path, index=False)
+
+class Crash(Exception):
+    pass
+
+def crash_after(chunks):
+    calls = []
+    def progress(fraction):
+        calls.append(fraction)
+        if len(calls) == chunks:
+            raise Crash()
+    return progress
+
+def test_resume_matches_uninterrupted_run(tmp_path):
+    expected_path = str(tmp_path / 'full.csv')
+    write_upload(expected_path)
+    assert page.process_comments_in_chunks(expected_path, 'DJT', chunksize=400, backend='lexicon') == ROWS
+    expected = pd.read_csv(expected_path)
+
+    file_path = str(tmp_path / 'resumed.csv')
+    write_upload(file_path)
+    with pytest.raises(Crash):
+        page.process_comments_in_chunks(file_path, 'DJT', chunksize=400, backend='lexicon', progress=crash_after(3))
+    assert page.read_checkpoint(file_path + '.checkpoint')['rows_done'] == 1200
+
+    # Bytes of an interrupted chunk past the checkpoint are dropped on resume
+    with open(file_path + '.part', 'a') as f:
+        f.write('half,written,row\n')
+    assert page.process_comments_in_chunks(file_path, 'DJT', chunksize=400, backend='lexicon') == ROWS
+
+    pd.testing.assert_frame_equal(pd.read_csv(file_path), expected)
+    assert not os.path.exists(file_path + '.checkpoint')
+    assert not os.path.exists(file_path + '.part')
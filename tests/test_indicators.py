@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dataset.indicators import (INDICATOR_COLUMNS, IndicatorEngine, _ema, append_bars, compute_indicators,
+                                read_stock_file, stock_file_paths)
+from dataset.watchlist import FakePriceProvider
+
+def make_bars(ticker='AAA', start='2023-01-02', end='2024-03-01'):
+    return FakePriceProvider().fetch([ticker], start, end)[ticker]
+
+def stored_bars(folder, ticker='AAA'):
+    return read_stock_file(stock_file_paths(ticker, folder)[0])
+
+def assert_matches_full_recompute(stored):
+    expected = compute_indicators(stored)
+    pd.testing.assert_frame_equal(stored[INDICATOR_COLUMNS], expected[INDICATOR_COLUMNS],
+                                  check_freq=False, rtol=1e-9, atol=1e-9)
+
+def test_incremental_appends_match_full_recompute(tmp_path):
+    bars = make_bars()
+    for start in range(0, len(bars), 37):  # Uneven pieces, some shorter than the rolling windows
+        append_bars('AAA', bars.iloc[start:start + 37], tmp_path)
+    stored = stored_bars(tmp_path)
+    assert len(stored) == len(bars)
+    assert_matches_full_recompute(stored)
+
+def test_missing_close_does_not_poison_the_state(tmp_path):
+    bars = make_bars()
+    bars.iloc[150, bars.columns.get_loc('Close')] = np.nan
+    bars.iloc[151, bars.columns.get_loc('Volume')] = np.nan
+    append_bars('AAA', bars.iloc[:151], tmp_path)  # Ends on the missing close
+    engine = IndicatorEngine.load(stock_file_paths('AAA', tmp_path)[1])
+    assert all(np.isfinite(value) for value in engine.state['ema'].values())
+    assert np.isfinite(engine.state['last_close'])
+
+    append_bars('AAA', bars.iloc[151:], tmp_path)
+    stored = stored_bars(tmp_path)
+    assert stored[['EMA_12', 'EMA_26', 'MACD_signal']].iloc[1:].notna().all().all()
+    assert_matches_full_recompute(stored)
+
+def test_changed_overlapping_bars_trigger_recompute(tmp_path):
+    bars = make_bars()
+    append_bars('AAA', bars, tmp_path)
+
+    changed = bars.iloc[200:261].copy()
+    changed['Close'] += 5
+    assert append_bars('AAA', changed, tmp_path) == len(bars)  # Whole history rewritten
+    stored = stored_bars(tmp_path)
+    np.testing.assert_allclose(stored['Close'].iloc[200:261], changed['Close'])
+    assert_matches_full_recompute(stored)
+
+def test_unchanged_overlap_only_appends_new_bars(tmp_path):
+    bars = make_bars()
+    append_bars('AAA', bars.iloc[:250], tmp_path)
+    assert append_bars('AAA', bars.iloc[240:260], tmp_path) == 10
+    assert append_bars('AAA', bars.iloc[240:260], tmp_path) == 0
+    assert len(stored_bars(tmp_path)) == 260
+
+def test_missing_bar_inside_history_triggers_recompute(tmp_path):
+    bars = make_bars()
+    append_bars('AAA', bars.drop(bars.index[100]), tmp_path)
+    assert append_bars('AAA', bars.iloc[100:101], tmp_path) == len(bars)
+    stored = stored_bars(tmp_path)
+    assert len(stored) == len(bars)
+    assert_matches_full_recompute(stored)
+
+@pytest.mark.parametrize('column', ['EMA_12', 'MACD_signal', 'RSI_14', 'BB_upper', 'Volatility_20'])
+def test_indicators_match_pandas(column):
+    bars = make_bars()
+    close = bars['Close']
+    result = compute_indicators(bars)
+    expected = {
+        'EMA_12': close.ewm(span=12, adjust=False).mean(),
+        'MACD_signal': (close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean())
+        .ewm(span=9, adjust=False).mean(),
+        'RSI_14': None,
+        'BB_upper': close.rolling(20).mean() + 2 * close.rolling(20).std(),
+        'Volatility_20': bars['Adj Close'].pct_change().rolling(20).std() * np.sqrt(252),
+    }[column]
+    if column == 'RSI_14':
+        change = close.diff()
+        gain = change.clip(lower=0).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+        loss = (-change.clip(upper=0)).iloc[1:].ewm(alpha=1 / 14, adjust=False).mean()
+        expected = (100 - 100 / (1 + gain / loss)).reindex(close.index)
+    pd.testing.assert_series_equal(result[column], expected, check_names=False, check_freq=False, rtol=1e-9)
+
+@pytest.mark.parametrize('span', [9, 26, 200])
+def test_ema_matches_pandas_over_many_blocks(span):
+    values = np.random.default_rng(0).normal(0, 1, 20000).cumsum()
+    expected = pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+    np.testing.assert_allclose(_ema(values, span=span), expected, rtol=0, atol=1e-9)
+
+    # Continuing from the last value of a first part gives the same result
+    first = _ema(values[:7000], span=span)
+    np.testing.assert_allclose(_ema(values[7000:], span=span, last=first[-1]), expected[7000:], rtol=0, atol=1e-9)
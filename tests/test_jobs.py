@@ -0,0 +1,103 @@
+import importlib
+import pandas as pd
+import pytest
+import dataset.jobs as jobs
+
+@pytest.fixture(autouse=True)
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_DB_PATH', str(tmp_path / 'jobs.db'))
+
+def import_page(name):
+    """Imports a page module, skipping the test when one of its heavy dependencies is missing."""
+    try:
+        return importlib.import_module(f'app_page.{name}')
+    except (ImportError, OSError) as e:
+        pytest.skip(f"{name} cannot be imported: {e}")
+
+def run(kind, params):
+    """Runs a job in this process exactly as a worker would (params go through the JSON column)."""
+    job_id = jobs.create_job(kind, params)
+    jobs._run_job(job_id)
+    return jobs.get_job(job_id), jobs.get_result(job_id)
+
+def assert_done(job):
+    assert job['status'] == jobs.DONE, job['error']
+
+def test_every_task_is_covered():
+    covered = {'scrape_news', 'process_comments', 'run_lda', 'auto_tune_lda', 'update_database',
+               'refresh_watchlist', 'assign_topics'}
+    assert set(jobs.TASKS) == covered
+
+def test_scrape_news(monkeypatch):
+    page = import_page('news_scraper_sentiment_analysis')
+    monkeypatch.setattr(page, 'scrape_news', lambda search, num_news, backend, job: (None, None, [search, num_news, backend]))
+    job, result = run('scrape_news', page.scrape_news_params('Trump', 20, 'lexicon'))
+    assert_done(job)
+    assert result == (None, None, ['Trump', 20, 'lexicon'])
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_process_comments(monkeypatch, streaming):
+    page = import_page('stocktwits_comment_sentiment_analysis')
+    df = pd.DataFrame({'Comment': ['good']})
+    monkeypatch.setattr(page, 'process_comments', lambda stock_ticker, backend, job: (df, 'comments.csv'))
+    monkeypatch.setattr(page, 'process_comments_in_chunks', lambda file_path, stock_ticker, **kwargs: 7)
+    monkeypatch.setattr(page, 'read_csv', lambda file_path, nrows: df)
+    job, result = run('process_comments', page.process_comments_params('DJT', streaming, 500, 'lexicon', b'a,b\n'))
+    assert_done(job)
+    assert result[0] == (7 if streaming else 1)
+
+def test_refresh_watchlist(monkeypatch, tmp_path):
+    page = import_page('stock_data_fetcher')
+    import dataset.watchlist as watchlist
+    refresh = watchlist.refresh_watchlist
+    monkeypatch.setattr(watchlist, 'refresh_watchlist',
+                        lambda *args, **kwargs: refresh(*args, folder=str(tmp_path), **kwargs))
+    job, summary = run('refresh_watchlist', page.refresh_watchlist_params(['AAA', 'BBB'], pd.Timestamp('2024-01-02').date(), 'fake'))
+    assert_done(job)
+    assert summary['New bars'].gt(0).all()
+
+def test_lda_jobs(monkeypatch, tmp_path):
+    page = import_page('topic_modeling_lda_analysis')
+    file_path = tmp_path / 'news.csv'
+    pd.DataFrame({'News Title': ['stock rally', 'stock fall']}).to_csv(file_path, index=False)
+    monkeypatch.setattr(page, 'run_lda', lambda job, **params: (['topic'], 'model'))
+    monkeypatch.setattr(page, 'auto_tune_lda', lambda texts, topic_range, filter_grid, chunksize, passes, job: (
+        'model', {'num_topics': topic_range[0]}, pd.DataFrame()))
+    monkeypatch.setattr(page, 'print_topics', lambda lda_model, num_topics: ['topic'] * num_topics)
+
+    job, result = run('run_lda', page.run_lda_params(str(file_path), 'News Title', 3, 1, 0.5, 100, 5))
+    assert_done(job)
+    job, result = run('auto_tune_lda', page.auto_tune_lda_params(str(file_path), 'News Title', (2, 4), [(1, 0.5)], 100, 5))
+    assert_done(job)
+    assert result[0] == ['topic', 'topic']
+
+    # Topic assignments reuse the model of a finished training job
+    monkeypatch.setattr(page, 'model_fingerprint', lambda lda_model: 'abc')
+    monkeypatch.setattr(page, 'assign_topics', lambda lda_model, fingerprint, source, tokenize, job: (1, 2))
+    job, result = run('assign_topics', page.assign_topics_params(job['id'], 'news'))
+    assert_done(job)
+
+def test_update_database(monkeypatch):
+    import dataset.database as database
+    monkeypatch.setattr(database, 'db', lambda job=None: None)
+    job, result = run('update_database', {})  # main.py submits no parameters
+    assert_done(job)
+
+def test_failed_task_records_error(monkeypatch):
+    import dataset.database as database
+    monkeypatch.setattr(database, 'db', lambda job=None: 1 / 0)
+    job, _ = run('update_database', {})
+    assert job['status'] == jobs.FAILED
+    assert job['error'].startswith('ZeroDivisionError')
+
+def test_unexpected_parameter_fails_the_job():
+    job, _ = run('update_database', {'day': '2024-10-04'})
+    assert job['status'] == jobs.FAILED
+    assert 'TypeError' in job['error']
+
+def test_cancel_without_progress_report_is_not_done(monkeypatch):
+    import dataset.database as database
+    monkeypatch.setattr(database, 'db', lambda job=None: jobs.cancel(job.job_id))  # Cancelled mid-step
+    job, result = run('update_database', {})
+    assert job['status'] == jobs.CANCELLED
+    assert result is None
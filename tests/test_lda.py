@@ -0,0 +1,57 @@
+import subprocess
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import dataset.lda as lda
+
+# Coherence per topic count: peaks at 3 topics, then falls
+COHERENCE = {2: 0.40, 3: 0.50, 4: 0.45, 5: 0.44, 6: 0.43, 7: 0.42, 8: 0.41}
+
+class ThreadPool(ThreadPoolExecutor):
+    """Stands in for the process pool, so the scheduling can be checked with a scripted trainer."""
+
+    def __init__(self, max_workers, mp_context=None, **kwargs):
+        super().__init__(max_workers, **kwargs)
+
+@pytest.fixture
+def scripted(monkeypatch):
+    trained = []
+    def train(filters, num_topics, chunksize, passes):
+        trained.append((filters, num_topics))
+        return filters, num_topics, COHERENCE[num_topics], f'model-{num_topics}'
+    monkeypatch.setattr(lda, 'ProcessPoolExecutor', ThreadPool)
+    monkeypatch.setattr(lda, '_train_candidate', train)
+    return trained
+
+@pytest.mark.parametrize('scores, expected', [
+    ({2: 0.4, 3: 0.5, 4: 0.45, 5: 0.44}, True),
+    ({2: 0.4, 3: 0.5, 4: 0.45}, False),
+    ({2: 0.4, 3: 0.5, 5: 0.44, 6: 0.43}, False),  # 4 is still training
+    ({2: 0.4, 3: 0.5, 4: 0.502, 5: 0.503}, True),  # Gains below min_delta do not count
+])
+def test_plateaued(scores, expected):
+    assert lda.plateaued(scores, range(2, 9), patience=2, min_delta=0.005) is expected
+
+def test_plateau_stops_larger_counts(scripted):
+    texts = [['stock', 'rally'], ['stock', 'fall']] * 5
+    lda_model, best_params, curve = lda.auto_tune_lda(texts, (2, 8), [(1, 1.0), (2, 1.0)], workers=8, patience=2)
+    assert lda_model == 'model-3'
+    assert best_params['num_topics'] == 3
+    for filters in [(1, 1.0), (2, 1.0)]:
+        counts = {num_topics for pair, num_topics in scripted if pair == filters}
+        assert {2, 3, 4, 5} <= counts <= {2, 3, 4, 5, 6}  # 7 and 8 are never started
+    assert len(curve) == len(scripted)
+
+def test_worker_module_has_no_page_side_effects():
+    code = "import sys, dataset.lda; print(sorted({'streamlit', 'nltk', 'pyLDAvis'} & set(sys.modules)))"
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                         cwd=Path(__file__).resolve().parents[1]).stdout
+    assert out.strip() == '[]'
+
+def test_auto_tune_trains_real_models():
+    texts = [['stock', 'rally', 'market', 'gain'], ['stock', 'fall', 'market', 'loss'],
+             ['election', 'vote', 'poll'], ['vote', 'election', 'result']] * 10
+    lda_model, best_params, curve = lda.auto_tune_lda(texts, (2, 3), [(1, 1.0)], chunksize=20, passes=2, workers=2)
+    assert lda_model.num_topics == best_params['num_topics']
+    assert curve['num_topics'].tolist() == [2, 3]
@@ -0,0 +1,84 @@
+import sqlite3
+import pandas as pd
+from dataset.schema_v2 import (COMPAT_VIEWS, SCHEMA_V2, ensure_schema, hash64, hash64_many, register_functions,
+                               upsert_comments, upsert_news)
+
+COMMENTS = pd.DataFrame({
+    'Username': ['a', 'b', 'c'],
+    'Comment': ['buy now', 'sell now', 'hold'],
+    'date': ['2024-10-01', '2024-10-01', '2024-10-02'],
+    'sentiment': [5, 1, 3],
+    'Ticker': ['DJT', 'DJT', None],
+})
+
+NEWS = pd.DataFrame({
+    'News Title': ['one', 'two'],
+    'Date': ['2024-10-01', '2024-10-02'],
+    'Source': ['A', None],
+    'URL': ['u1', 'u2'],
+    'sentiment': [2, 4],
+    'search_query': ['Trump', 'Trump'],
+})
+
+def test_hash64_many_matches_hash64():
+    texts = ['a', '', None, 1.5, 'é']
+    assert hash64_many(texts) == [hash64(text) for text in texts]
+
+def test_unchanged_rows_are_not_rewritten(conn):
+    upsert_comments(conn, COMMENTS)
+    upsert_news(conn, NEWS)
+    before = conn.total_changes
+    upsert_comments(conn, COMMENTS)
+    upsert_news(conn, NEWS)
+    assert conn.total_changes == before
+
+def test_changed_rows_are_updated_in_place(conn):
+    upsert_comments(conn, COMMENTS)
+    upsert_news(conn, NEWS)
+    ids = conn.execute("SELECT id FROM Stocktwits_Comments ORDER BY id").fetchall()
+
+    before = conn.total_changes
+    upsert_comments(conn, COMMENTS.assign(sentiment=[5, 2, 3]))
+    upsert_news(conn, NEWS.assign(**{'News Title': ['one', 'two (updated)']}))
+    assert conn.total_changes - before == 2
+    assert conn.execute("SELECT id FROM Stocktwits_Comments ORDER BY id").fetchall() == ids
+    assert conn.execute("SELECT sentiment FROM Stocktwits_Comments WHERE Username = 'b'").fetchone() == (2,)
+    assert conn.execute("""SELECT "News Title" FROM News WHERE URL = 'u2'""").fetchone() == ('two (updated)',)
+
+def backends(conn):
+    return dict(conn.execute("SELECT Username, sentiment_backend FROM Stocktwits_Comments"))
+
+def test_backend_is_recorded_with_the_score(conn):
+    upsert_comments(conn, COMMENTS.assign(sentiment_backend='lexicon'))
+    assert backends(conn) == {'a': 'lexicon', 'b': 'lexicon', 'c': 'lexicon'}
+
+    # A file without the column keeps the recorded backend unless the score changed
+    upsert_comments(conn, COMMENTS.assign(sentiment=[5, 2, 3]))
+    assert backends(conn) == {'a': 'lexicon', 'b': None, 'c': 'lexicon'}
+
+    before = conn.total_changes
+    upsert_comments(conn, COMMENTS.assign(sentiment=[5, 2, 3], sentiment_backend='bert'))
+    assert conn.total_changes - before == 3  # Same scores, different backend
+    assert set(backends(conn).values()) == {'bert'}
+
+def test_original_tables_are_migrated_as_bert():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE Stocktwits_Comments (Username TEXT, Comment TEXT, date DATE, sentiment INT, Ticker TEXT);
+        CREATE TABLE News ("News Title" TEXT, Date DATE, Source TEXT, URL TEXT, sentiment INT, search_query TEXT);
+        INSERT INTO Stocktwits_Comments VALUES ('a', 'buy now', '2024-10-01', 5, 'DJT');
+    """)
+    ensure_schema(conn)
+    assert backends(conn) == {'a': 'bert'}
+
+def test_existing_compact_tables_get_the_backend_column():
+    conn = sqlite3.connect(':memory:')
+    register_functions(conn)
+    old_schema = SCHEMA_V2.replace("sentiment_backend TEXT,", "").replace(",\n        sentiment_backend TEXT", "")
+    old_views = COMPAT_VIEWS.replace(", c.sentiment_backend", "").replace(",\n            n.sentiment_backend", "")
+    conn.executescript(old_schema + old_views)
+    assert 'sentiment_backend' not in {row[1] for row in conn.execute("PRAGMA table_info(News_v2)")}
+
+    ensure_schema(conn)
+    upsert_news(conn, NEWS.assign(sentiment_backend=['bert', 'lexicon']))
+    assert conn.execute("SELECT URL, sentiment_backend FROM News ORDER BY URL").fetchall() == [('u1', 'bert'), ('u2', 'lexicon')]
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from dataset.database import ensure_search_index
+from dataset.schema_v2 import upsert_comments, upsert_news
+from dataset.search import build_match_query, count_matches, daily_match_sentiment, lemmatize_search, search_matches
+
+@pytest.fixture
+def indexed(conn):
+    """Stores a few lemmatized rows (as the pages save them) behind the full-text index."""
+    ensure_search_index(conn)
+    upsert_news(conn, pd.DataFrame({
+        'News Title': ['the election result be in', 'stock rally after the vote', 'market calm'],
+        'Date': ['2024-11-05', '2024-11-06', '2024-11-06'],
+        'Source': ['A', 'B', 'A'],
+        'URL': ['u1', 'u2', 'u3'],
+        'sentiment': [3, 5, 3],
+        'search_query': ['election'] * 3,
+    }))
+    upsert_comments(conn, pd.DataFrame({
+        'Username': ['a', 'b'],
+        'Comment': ['win big on this stock', 'I lose again'],
+        'date': ['2024-11-06', '2024-11-07'],
+        'sentiment': [5, 1],
+        'Ticker': ['TSLA', 'TSLA'],
+    }))
+    conn.commit()
+    return conn
+
+def test_build_match_query_quotes_words():
+    assert build_match_query('tari* "AND" (x)') == '"tari"* "AND" "x"'
+    assert build_match_query('  !! ') == ''
+
+@pytest.mark.parametrize('table, search, expected', [
+    ('News', 'elections', 1),
+    ('News', 'election', 1),
+    ('News', 'rallies', 1),
+    ('News', 'stocks rallying', 1),
+    ('Stocktwits_Comments', 'winning', 1),
+    ('Stocktwits_Comments', 'stocks', 1),
+    ('Stocktwits_Comments', 'losing', 1),
+])
+def test_inflected_query_hits_lemma(indexed, table, search, expected):
+    assert count_matches(indexed, table, search) == expected
+
+def test_search_results_and_daily_sentiment(indexed):
+    rows = search_matches(indexed, 'News', 'votes')
+    assert rows['News Title'].tolist() == ['stock rally after the vote']
+    daily = daily_match_sentiment(indexed, 'News', 'elect*')
+    assert daily[['Date', 'matches']].values.tolist() == [['2024-11-05', 1]]
+
+def test_index_follows_updates_and_deletes(indexed):
+    indexed.execute("""UPDATE News_v2 SET "News Title" = 'quiet day' WHERE URL = 'u2'""")
+    indexed.execute("DELETE FROM News_v2 WHERE URL = 'u1'")
+    assert count_matches(indexed, 'News', 'rallies') == 0
+    assert count_matches(indexed, 'News', 'elections') == 0
+    assert count_matches(indexed, 'News', 'quiet') == 1
+
+def test_old_index_is_rebuilt_with_stemming(conn):
+    # Index created by an earlier version without the Porter stemmer
+    upsert_news(conn, pd.DataFrame({'News Title': ['rally continue'], 'Date': ['2024-01-01'], 'Source': ['A'],
+                                    'URL': ['u1'], 'sentiment': [4], 'search_query': ['q']}))
+    conn.execute("""CREATE VIRTUAL TABLE News_fts USING fts5("News Title", content='News', content_rowid='id')""")
+    conn.execute("INSERT INTO News_fts(News_fts) VALUES ('rebuild')")
+    assert count_matches(conn, 'News', 'rallies') == 0
+
+    ensure_search_index(conn)
+    assert count_matches(conn, 'News', 'rallies') == 1
+
+def test_lemmatized_search_hits_irregular_forms(indexed):
+    lemmas = {'won': 'win', 'lost': 'lose'}
+    search = lemmatize_search('won stock*', lambda words: [lemmas.get(word, word) for word in words])
+    assert search == 'win stock*'
+    assert count_matches(indexed, 'Stocktwits_Comments', 'won') == 0  # Irregular forms need the lemma
+    assert count_matches(indexed, 'Stocktwits_Comments', search) == 1
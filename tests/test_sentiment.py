@@ -0,0 +1,44 @@
+import itertools
+import numpy as np
+import pytest
+from dataset.benchmark_sentiment import calibrate_cuts
+from dataset.sentiment import SentimentBackend
+
+def test_backend_must_implement_score():
+    class Incomplete(SentimentBackend):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+def test_calibrated_cuts_match_the_score_shares():
+    compound = np.repeat([-0.9, -0.3, 0.0, 0.3, 0.9], [10, 20, 40, 20, 10])
+    stored = np.repeat([1, 2, 3, 4, 5], [10, 20, 40, 20, 10])
+    cuts = calibrate_cuts(compound, stored)
+    assert cuts == (-0.6, -0.15, 0.15, 0.6)
+    assert (np.searchsorted(cuts, compound, side='right') + 1 == stored).all()
+
+def brute_force_cost(compound, stored):
+    """Smallest total quantile difference over every set of four increasing midpoints."""
+    values = np.unique(compound)
+    below = np.searchsorted(np.sort(compound), (values[1:] + values[:-1]) / 2) / len(compound)
+    target = np.cumsum(np.bincount(stored, minlength=6)[1:5]) / len(stored)
+    return min(np.abs(below[list(cut)] - target).sum() for cut in itertools.combinations(range(len(below)), 4))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_calibrated_cuts_are_the_best_quantile_match(seed):
+    rng = np.random.default_rng(seed)
+    compound = np.round(rng.normal(size=300), 1)  # Many ties, as with the lexicon
+    stored = rng.integers(1, 6, size=300)
+    cuts = calibrate_cuts(compound, stored)
+    assert list(cuts) == sorted(set(cuts))
+    target = np.cumsum(np.bincount(stored, minlength=6)[1:5]) / len(stored)
+    cost = sum(abs(np.mean(compound < cut) - share) for cut, share in zip(cuts, target))
+    assert cost == pytest.approx(brute_force_cost(compound, stored))
+
+def test_calibration_scales_to_many_distinct_scores():
+    rng = np.random.default_rng(0)
+    compound = rng.uniform(-1, 1, size=100_000)  # About 10^18 sets of four cuts for an exhaustive search
+    stored = np.repeat([1, 2, 3, 4, 5], 20_000)
+    cuts = calibrate_cuts(compound, stored)
+    assert cuts == pytest.approx((-0.6, -0.2, 0.2, 0.6), abs=0.01)  # The quintiles of the uniform scores
@@ -0,0 +1,45 @@
+import sqlite3
+import pandas as pd
+import pytest
+import dataset.data_access as data_access
+
+report = pytest.importorskip('app_page.sentiment_report')
+
+def comments(backends):
+    return pd.DataFrame({'date': ['2024-10-04'] * len(backends), 'sentiment': [3] * len(backends),
+                         'sentiment_backend': backends})
+
+def test_missing_backend_column_counts_as_not_recorded():
+    news = pd.DataFrame({'Date': ['2024-10-04'], 'sentiment': [2]})
+    assert report.backend_names(news).tolist() == [report.NOT_RECORDED]
+    kept_news, kept_comments = report.filter_backends(news, news.rename(columns={'Date': 'date'}))
+    assert len(kept_news) == len(kept_comments) == 1
+
+def test_mixed_backends_are_all_kept_by_default():
+    news = pd.DataFrame({'Date': ['2024-10-04'], 'sentiment': [2], 'sentiment_backend': [None]})
+    kept_news, kept_comments = report.filter_backends(news, comments(['bert', 'lexicon']))
+    assert len(kept_news) == 1 and len(kept_comments) == 2
+
+def run_report():
+    from app_page.sentiment_report import main
+    main()
+
+def test_report_runs_on_a_database_not_yet_migrated(tmp_path, monkeypatch):
+    """The committed database still has the original (v1) tables until Update Database runs."""
+    from streamlit.testing.v1 import AppTest
+    path = tmp_path / 'TrendTeller.db'
+    with sqlite3.connect(path) as conn:
+        conn.executescript("""
+            CREATE TABLE Stocktwits_Comments (Username TEXT, Comment TEXT, date DATE, sentiment INT, Ticker TEXT);
+            CREATE TABLE News ("News Title" TEXT, Date DATE, Source TEXT, URL TEXT, sentiment INT, search_query TEXT);
+            INSERT INTO Stocktwits_Comments VALUES ('a', 'rally', '2024-10-04', 5, 'DJT'), ('b', 'crash', '2024-10-07', 1, 'DJT');
+            INSERT INTO News VALUES ('rally', '2024-10-04', 'A', 'u1', 4, 'Trump'), ('crash', '2024-10-07', 'A', 'u2', 2, 'Trump');
+        """)
+    data_access.close_connections()
+    monkeypatch.setattr(data_access, 'DB_PATH', str(path))
+    try:
+        app = AppTest.from_function(run_report, default_timeout=60).run()
+    finally:
+        data_access.close_connections()
+    assert not app.exception, [e.value for e in app.exception]
+    assert not [w.value for w in app.warning if 'different models' in w.value]
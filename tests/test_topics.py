@@ -0,0 +1,47 @@
+import pytest
+from gensim import corpora
+from gensim.models import LdaModel
+from dataset.data_access import reader, writer
+from dataset.jobs import JobCancelled
+from dataset.topics import assign_topics, list_topic_models
+
+TEXTS = [['stock', 'rally', 'market'], ['earnings', 'beat', 'stock'], ['market', 'fall', 'fear']] * 4
+
+@pytest.fixture
+def lda_model():
+    dictionary = corpora.Dictionary(TEXTS)
+    return LdaModel([dictionary.doc2bow(text) for text in TEXTS], id2word=dictionary, num_topics=2,
+                    random_state=1, passes=2)
+
+@pytest.fixture
+def comments(temp_db):
+    with writer() as conn:
+        conn.executemany("INSERT INTO Stocktwits_Comments_v2 (comment_hash, Comment) VALUES (?, ?)",
+                         [(bytes([i]), ' '.join(text)) for i, text in enumerate(TEXTS)])
+
+def stored_rows():
+    with reader() as conn:
+        return conn.execute("SELECT COUNT(*) FROM Document_Topics").fetchone()[0]
+
+def test_completed_model_is_listed(comments, lda_model):
+    model_id, assigned = assign_topics(lda_model, 'fp', 'comments', str.split, chunksize=5)
+    assert assigned == len(TEXTS) == stored_rows()
+    with reader() as conn:
+        assert list_topic_models(conn)['id'].tolist() == [model_id]
+
+def test_cancelled_run_is_hidden_and_removed(comments, lda_model, cancel_after):
+    with pytest.raises(JobCancelled):
+        assign_topics(lda_model, 'fp', 'comments', str.split, chunksize=5, job=cancel_after(2))
+    assert stored_rows() == 0
+    with reader() as conn:
+        assert list_topic_models(conn).empty
+
+def test_rerun_hides_the_earlier_complete_run_until_done(comments, lda_model, cancel_after):
+    assign_topics(lda_model, 'fp', 'comments', str.split, chunksize=5)
+    with pytest.raises(JobCancelled):
+        assign_topics(lda_model, 'fp', 'comments', str.split, chunksize=5, job=cancel_after(1))
+    with reader() as conn:
+        assert list_topic_models(conn).empty
+    model_id, _ = assign_topics(lda_model, 'fp', 'comments', str.split, chunksize=5)
+    with reader() as conn:
+        assert list_topic_models(conn)['id'].tolist() == [model_id]
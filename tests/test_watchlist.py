@@ -0,0 +1,59 @@
+from datetime import date
+import pytest
+from dataset.jobs import JobCancelled
+from dataset.watchlist import FakePriceProvider, NO_DATA, fetch_frames, plan_batches, refresh_watchlist
+
+TICKERS = [f'T{i:02d}' for i in range(16)]
+
+def test_fetch_frames_isolates_a_failing_ticker():
+    provider = FakePriceProvider(fail={'T05'})
+    frames, errors = fetch_frames(provider, TICKERS, date(2024, 1, 2), date(2024, 2, 1))
+    assert set(frames) == set(TICKERS) - {'T05'}
+    assert list(errors) == ['T05']
+    assert len(provider.calls) <= 1 + 2 * 4  # Halving: about 2 * log2(16) extra requests, not one per ticker
+
+def test_fetch_frames_reports_every_ticker_when_all_fail():
+    frames, errors = fetch_frames(FakePriceProvider(fail=TICKERS[:4]), TICKERS[:4], date(2024, 1, 2), date(2024, 2, 1))
+    assert frames == {}
+    assert sorted(errors) == TICKERS[:4]
+
+@pytest.mark.parametrize('batch_size, requests', [(50, 2), (5, 4), (1, 16)])
+def test_plan_batches_request_count(batch_size, requests):
+    starts = {ticker: date(2024, 1, 2) if i < 12 else date(2024, 3, 1) for i, ticker in enumerate(TICKERS)}
+    batches = plan_batches(starts, batch_size)
+    assert len(batches) == requests
+    assert sorted(ticker for _, batch in batches for ticker in batch) == TICKERS
+    assert all(len(batch) <= batch_size for _, batch in batches)
+    assert all(starts[ticker] == start for start, batch in batches for ticker in batch)
+
+def test_refresh_appends_only_new_bars(tmp_path):
+    provider = FakePriceProvider(fail={'BAD'})
+    first = refresh_watchlist(['AAA', 'BBB'], date(2024, 1, 2), end=date(2024, 2, 1), provider=provider,
+                              batch_size=10, folder=tmp_path)
+    assert first['New bars'].tolist() == [22, 22]  # Business days in January from the 2nd
+    assert first.attrs['requests'] == 1
+
+    # AAA and BBB continue from their last stored day; CCC is new; BAD fails on its own
+    provider.calls.clear()
+    second = refresh_watchlist(['AAA', 'BBB', 'CCC', 'BAD'], date(2024, 1, 2), end=date(2024, 2, 8),
+                               provider=provider, batch_size=10, folder=tmp_path).set_index('Ticker')
+    assert second.loc[['AAA', 'BBB'], 'New bars'].tolist() == [5, 5]
+    assert second.loc['CCC', 'New bars'] == 27
+    assert second.loc['BAD', 'Error'].startswith('Request failed')
+    assert (second.loc[['AAA', 'BBB', 'CCC'], 'Error'] == '').all()
+    assert ['AAA', 'BBB'] in provider.calls  # One request for both tickers from the same start date
+
+    # Nothing new: up-to-date tickers are not errors and nothing is written
+    third = refresh_watchlist(['AAA'], date(2024, 1, 2), end=date(2024, 2, 8), provider=provider, folder=tmp_path)
+    assert third['New bars'].tolist() == [0]
+    assert third['Error'].tolist() == ['']
+    assert NO_DATA not in third['Error'].tolist()
+
+def test_cancel_stops_requesting_batches(tmp_path, cancel_after):
+    provider = FakePriceProvider(delay=0.05)
+    tickers = [f'T{i}' for i in range(10)]
+    with pytest.raises(JobCancelled):
+        refresh_watchlist(tickers, date(2024, 1, 2), end=date(2024, 2, 1), provider=provider, batch_size=1,
+                          workers=1, folder=tmp_path, job=cancel_after(1))
+    assert len(provider.calls) <= 2  # The batch that was running when it was cancelled, at most
+    assert not list(tmp_path.iterdir())  # Nothing written